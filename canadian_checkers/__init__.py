@@ -0,0 +1,19 @@
+'''Канадские шашки.
+
+Пакет без графического интерфейса: правила, состояние партии и компьютерный
+противник импортируются без tkinter и PIL. Интерфейс находится в модуле gui
+и запускается командой python -m canadian_checkers.
+'''
+from .core import (
+    SideType, CheckerType, Point, Move, Checker, FieldChecker,
+    X_SIZE, Y_SIZE, MOVE_OFFSETS, WHITE_CHECKERS, BLACK_CHECKERS,
+    BoardLayout, BitBoard, Turn, MoveUndo, Field, GameState,
+)
+from .engine import (
+    MAX_PREDICTION_DEPTH, ENGINE_TIME_LIMIT, ENGINE_SOFT_TIME_LIMIT, TT_SIZE_MB,
+    evaluate, TranspositionTable, SearchResult, SearchTimeout, Engine,
+)
+from .notation import (
+    POSITION_SIZE, PositionCodec, position_to_fen, position_from_fen,
+    encode_position, decode_position, encode_positions, decode_positions,
+)
@@ -0,0 +1,58 @@
+'''Запуск игры: python -m canadian_checkers
+
+Команда perft считает позиции для проверки генератора ходов:
+python -m canadian_checkers perft --depth 4
+
+Команда engine запускает движок без интерфейса с текстовым протоколом
+через stdin/stdout (см. модуль protocol):
+python -m canadian_checkers engine
+
+Команда pdn выводит партии из журнала (см. модуль gamelog) в виде PDN:
+python -m canadian_checkers pdn --log games.log > games.pdn
+'''
+import argparse
+import sys
+
+from . import gamelog, perft
+from .engine import TT_SIZE_MB
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m canadian_checkers', description='Канадские шашки')
+    commands = parser.add_subparsers(dest='command')
+
+    perft_parser = commands.add_parser('perft', help='подсчёт позиций со сверкой с эталоном')
+    perft_parser.add_argument('--depth', type=int, default=4)
+    perft_parser.add_argument('--position', action='append', choices=list(perft.POSITIONS),
+                              help='тестовая позиция (по умолчанию все)')
+    perft_parser.add_argument('--divide', action='store_true',
+                              help='число позиций после каждого первого хода целиком (со всеми взятиями)')
+
+    engine_parser = commands.add_parser('engine', help='движок с текстовым протоколом через stdin/stdout')
+    engine_parser.add_argument('--tt-size', type=float, default=TT_SIZE_MB, help='размер таблицы транспозиций, МБ')
+
+    pdn_parser = commands.add_parser('pdn', help='партии из журнала в виде PDN')
+    pdn_parser.add_argument('--log', default=gamelog.GAME_LOG_PATH, help='файл журнала партий')
+
+    args = parser.parse_args()
+    if args.command == 'perft':
+        sys.exit(0 if perft.run(args.depth, args.position, args.divide) else 1)
+    if args.command == 'engine':
+        from . import protocol
+        protocol.run(tt_size_mb=args.tt_size)
+        return
+    if args.command == 'pdn':
+        try:
+            gamelog.export_pdn(args.log, sys.stdout)
+        except (OSError, ValueError) as error:
+            print(f'Не удалось прочитать журнал партий: {error}', file=sys.stderr)
+            sys.exit(1)
+        return
+
+    # Запуск интерфейса авторизации
+    from .gui import auth_gui
+    auth_gui()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+'''Замеры производительности движка канадских шашек
+
+Запуск: python -m canadian_checkers.benchmarks allocations --depth 4
+        python -m canadian_checkers.benchmarks parallel --depth 5 --workers 1 2 4 8
+        python -m canadian_checkers.benchmarks latency --depth 5
+        python -m canadian_checkers.benchmarks ordering --depth 6
+        python -m canadian_checkers.benchmarks users --count 1000000
+        python -m canadian_checkers.benchmarks hashing
+        python -m canadian_checkers.benchmarks notation --count 10000
+        python -m canadian_checkers.benchmarks gamelog --count 1000000
+'''
+import argparse
+import gc
+import io
+import itertools
+import json
+import pickle
+import random
+import sys
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+from time import perf_counter, sleep
+
+from .core import BitBoard, SideType, GameState, X_SIZE, Y_SIZE
+from .engine import Engine
+from .gamelog import GameLog, read_games, record_from_game, game_to_pdn
+from .notation import POSITION_SIZE, encode_positions, decode_positions, position_to_fen, position_from_fen
+from .parallel import ParallelEngine
+from .perft import POSITIONS, get_position
+from .protocol import moves_to_text
+from .users import SQLiteUserStore, JSONUserStore, PasswordHasher, hash_password
+from .worker import EngineWorker
+
+
+def walk_with_copies(board: BitBoard, side: SideType, depth: int, keep: list = None) -> int:
+    '''Перебор дерева ходов с копированием доски в каждом узле.
+    Если задан keep, созданные копии доски сохраняются в нём'''
+    if depth == 0:
+        return 1
+    nodes = 1
+    for turn in board.turns(side):
+        child = board.copy()
+        child.make_turn(turn)
+        if keep is not None:
+            keep.append(child)
+        nodes += walk_with_copies(child, SideType.opposite(side), depth - 1, keep)
+    return nodes
+
+
+def walk_with_undo(board: BitBoard, side: SideType, depth: int, keep: list = None) -> int:
+    '''Перебор дерева ходов на одной доске через make_turn/unmake_turn.
+    Если задан keep, созданные записи отмены сохраняются в нём'''
+    if depth == 0:
+        return 1
+    nodes = 1
+    for turn in board.turns(side):
+        undo = board.make_turn(turn)
+        if keep is not None:
+            keep.append(undo)
+        nodes += walk_with_undo(board, SideType.opposite(side), depth - 1, keep)
+        board.unmake_turn(undo)
+    return nodes
+
+
+def allocations(depth: int):
+    '''Сравнение памяти и времени перебора: копии доски против make/unmake.
+
+    Время замеряется без tracemalloc. Память замеряется отдельным перебором, в
+    котором всё созданное в узлах (копии доски или записи отмены) сохраняется до
+    конца перебора: разница снимков tracemalloc - это байты и блоки, выделенные
+    под эти объекты. Временные объекты, общие для обоих способов (списки ходов),
+    в разницу не попадают.
+    '''
+    board = BitBoard(X_SIZE, Y_SIZE)
+    board.generate()
+
+    print(f'Перебор на глубину {depth} из начальной позиции')
+    for name, walk in (('копирование', walk_with_copies), ('make/unmake', walk_with_undo)):
+        gc.collect()
+        start = perf_counter()
+        nodes = walk(board, SideType.WHITE, depth)
+        elapsed = perf_counter() - start
+
+        keep = []
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        walk(board, SideType.WHITE, depth, keep)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Список keep учитывается отдельно: он нужен только для замера
+        stats = after.compare_to(before, 'filename')
+        allocated = sum(stat.size_diff for stat in stats) - sys.getsizeof(keep)
+        blocks = sum(stat.count_diff for stat in stats) - 1
+        del keep
+
+        print(f'  {name:12} узлов {nodes:8}, {elapsed:6.2f} с, {nodes / elapsed:8.0f} узлов/с; '
+              f'выделено {allocated / nodes:6.1f} байт и {blocks / nodes:5.2f} блоков на узел, '
+              f'пик при замере {peak / 1024:8.1f} КБ')
+
+
+def parallel(depth: int, workers: list[int], names: list[str]) -> bool:
+    '''Ускорение и эффективность параллельного поиска на фиксированной глубине.
+    Ход и оценка сверяются с последовательным поиском; True, если всё совпало'''
+    success = True
+    for name in names:
+        board, side = get_position(name)
+        expected = Engine(depth, time_limit=float('inf'), soft_time_limit=float('inf')).search(board, side)
+        base = expected.elapsed
+        print(f'{name}: последовательно {base:7.2f} с, узлов {expected.nodes:8}, оценка {expected.score}')
+
+        for count in workers:
+            with ParallelEngine(depth, time_limit=float('inf'), workers=count,
+                                soft_time_limit=float('inf')) as engine:
+                # Процессы запускаются и импортируют модули до замера
+                engine.depth = 1
+                engine.search(board, side)
+                engine.tt.clear()
+                engine.depth = depth
+                result = engine.search(board, side)
+            speedup = base / result.elapsed
+            same = result.moves == expected.moves and result.score == expected.score
+            success &= same
+            print(f'  процессов {count:2}: {result.elapsed:7.2f} с, узлов {result.nodes:8}, оценка {result.score}, '
+                  f'ускорение {speedup:5.2f}, эффективность {speedup / count:4.0%}'
+                  + ('' if same else f', РАСХОЖДЕНИЕ: ход {moves_to_text(result.moves)} вместо '
+                                     f'{moves_to_text(expected.moves)}'))
+    return success
+
+
+def timer_delays(poll, delay: float = 0.02) -> str:
+    '''Задержка срабатывания таймера главного потока, пока работа идёт в фоновом потоке.
+
+    Главный поток, как интерфейс через after(), просыпается каждые delay секунд и
+    вызывает poll(), пока тот не вернёт True; замеряется, насколько позже срока он
+    получает управление.
+    '''
+    delays = []
+    while True:
+        start = perf_counter()
+        sleep(delay)
+        delays.append(perf_counter() - start - delay)
+        if poll():
+            break
+
+    delays.sort()
+    mean = sum(delays) / len(delays)
+    p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))]
+    return (f'опросов {len(delays):5}, задержка: средняя {mean * 1000:5.1f} мс, 99% {p99 * 1000:5.1f} мс, '
+            f'наибольшая {delays[-1] * 1000:5.1f} мс')
+
+
+def latency(depth: int, names: list[str]):
+    '''Задержка интерфейса, пока движок думает в фоновом потоке'''
+    for name in names:
+        board, side = get_position(name)
+        engine = Engine(depth, time_limit=float('inf'), soft_time_limit=float('inf'))
+        worker = EngineWorker(engine, pondering=False)
+        result = None
+
+        def poll():
+            nonlocal result
+            result = worker.poll()
+            return result is not None
+
+        worker.search(board, side)
+        delays = timer_delays(poll)
+        worker.close()
+        print(f'{name}: поиск {result.elapsed:6.2f} с, узлов {result.nodes:8}, {delays}')
+
+
+def hashing(rounds: int = 5):
+    '''Время хеширования пароля при разных параметрах и задержка интерфейса, пока хеш
+    считается в фоновом потоке (в главном потоке интерфейс замер бы на всё время хеширования)'''
+    hashers = [PasswordHasher('pbkdf2_sha256', iterations=iterations) for iterations in (100000, 300000, 600000, 1200000)]
+    hashers += [PasswordHasher('scrypt', n=n) for n in (2 ** 14, 2 ** 15, 2 ** 16)]
+    for hasher in hashers:
+        start = perf_counter()
+        password_hash = hasher.hash('password')
+        elapsed = perf_counter() - start
+
+        # Проверка паролей в фоновом потоке, как при входе
+        thread = threading.Thread(target=lambda: [hasher.verify('password', password_hash) for _ in range(rounds)])
+        thread.start()
+        delays = timer_delays(lambda: not thread.is_alive())
+        thread.join()
+        print(f'{hasher.kdf:13} {str(hasher.params):16}: хеш {elapsed * 1000:7.1f} мс, {delays}')
+
+
+def ordering(depth: int, names: list[str]):
+    '''Число узлов при поиске на фиксированную глубину с упорядочиванием ходов и без него'''
+    for name in names:
+        board, side = get_position(name)
+        results = {}
+        for enabled in (False, True):
+            engine = Engine(depth, time_limit=float('inf'), soft_time_limit=float('inf'), ordering=enabled)
+            results[enabled] = engine.search(board, side)
+        off, on = results[False], results[True]
+        print(f'{name}: без упорядочивания узлов {off.nodes:9}, {off.elapsed:6.2f} с, оценка {off.score}; '
+              f'с упорядочиванием узлов {on.nodes:9}, {on.elapsed:6.2f} с, оценка {on.score}; '
+              f'узлов меньше в {off.nodes / on.nodes:5.2f} раза')
+
+
+def timed(operation, repeat: int) -> float:
+    '''Среднее время одного вызова operation(i), мс'''
+    start = perf_counter()
+    for i in range(repeat):
+        operation(i)
+    return (perf_counter() - start) / repeat * 1000
+
+
+def users(count: int, lookups: int = 10000):
+    '''Вход и регистрация при count пользователях: база SQLite против файла JSON'''
+    names = [f'user{i}' for i in range(count)]
+    password_hash = hash_password('password')
+    sample = random.Random(0).choices(names, k=lookups)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        with SQLiteUserStore(str(directory / 'users.db')) as store:
+            start = perf_counter()
+            store.add_many((name, password_hash) for name in names)
+            print(f'SQLite: {count} пользователей записано за {perf_counter() - start:.2f} с')
+
+            def lookup(i):
+                store.cache.clear()
+                store.get(sample[i])
+
+            print(f'  вход (поиск по индексу):  {timed(lookup, lookups):8.4f} мс')
+            print(f'  вход (из кэша):           {timed(lambda i: store.get(sample[i % 100]), lookups):8.4f} мс')
+            print(f'  неизвестное имя:          {timed(lambda i: store.get(f"nobody{i}"), lookups):8.4f} мс')
+            print(f'  регистрация:              {timed(lambda i: store.add(f"new{i}", password_hash), 1000):8.4f} мс')
+
+        json_store = JSONUserStore(str(directory / 'users.json'))
+        with open(json_store.path, 'w') as file:
+            json.dump(dict.fromkeys(names, password_hash), file)
+        print(f'JSON: {count} пользователей')
+        print(f'  вход (чтение файла):      {timed(lambda i: json_store.get(sample[i]), 3):8.4f} мс')
+        print(f'  регистрация (перезапись): {timed(lambda i: json_store.add(f"new{i}", password_hash), 3):8.4f} мс')
+
+
+def random_positions(count: int, seed: int = 0) -> list[tuple[GameState, BitBoard, SideType]]:
+    '''Позиции из случайных партий: партия, доска и очередь хода'''
+    rnd = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = GameState(X_SIZE, Y_SIZE)
+        for _ in range(rnd.randrange(120)):
+            turns = game.field.board.turns(game.current_player)
+            if not turns:
+                break
+            game.field.board.make_turn(rnd.choice(turns))
+            game.current_player = SideType.opposite(game.current_player)
+        positions.append((game, game.field.board, game.current_player))
+    return positions
+
+
+def notation(count: int):
+    '''Размер и скорость записи позиций: pickle партии против текста и двоичной записи'''
+    positions = random_positions(count)
+    pairs = [(board, side) for _, board, side in positions]
+    print(f'{count} позиций из случайных партий')
+
+    def measure(name, encode, decode):
+        start = perf_counter()
+        data = encode()
+        encoded = perf_counter() - start
+        start = perf_counter()
+        decode(data)
+        decoded = perf_counter() - start
+        print(f'  {name:22} {len(data) / count:7.1f} байт/позиция, запись {encoded / count * 1e6:7.2f} мкс, '
+              f'чтение {decoded / count * 1e6:7.2f} мкс')
+
+    measure('pickle GameState', lambda: pickle.dumps([game for game, _, _ in positions]), pickle.loads)
+    measure('текст FEN', lambda: '\n'.join(position_to_fen(board, side) for board, side in pairs).encode(),
+            lambda data: [position_from_fen(line) for line in data.decode().split('\n')])
+    measure(f'двоичная ({POSITION_SIZE} байт)', lambda: encode_positions(pairs),
+            lambda data: list(decode_positions(data)))
+
+
+def random_games(count: int, seed: int = 0) -> list:
+    '''Записи случайных партий до конца или до 200 ходов'''
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(count):
+        game = GameState(X_SIZE, Y_SIZE)
+        for _ in range(200):
+            if game.continuing_cell:
+                moves = game.get_required_moves_list_for_checker(game.current_player, game.continuing_cell.x,
+                                                                 game.continuing_cell.y)
+            else:
+                moves = game.get_moves_list(game.current_player)
+            if not moves:
+                break
+            game.play_move(rnd.choice(moves))
+        records.append(record_from_game(game, game.get_winner()))
+    return records
+
+
+def gamelog(count: int, sync_every: list[int], distinct: int = 200):
+    '''Запись партий в журнал с fsync пачками, потоковое чтение и перевод в PDN'''
+    records = random_games(distinct)
+    with tempfile.TemporaryDirectory() as directory:
+        for every in sync_every:
+            path = str(Path(directory) / f'games{every}.log')
+            # При fsync после каждой партии записывается меньше партий, чтобы замер не затянулся
+            written = count if every > 1 else min(count, 1000)
+            start = perf_counter()
+            with GameLog(path, sync_every=every, sync_interval=float('inf')) as log:
+                for i in range(written):
+                    log.append(records[i % distinct])
+            elapsed = perf_counter() - start
+            size = Path(path).stat().st_size
+            print(f'fsync каждые {every:5} партий: {written} партий за {elapsed:6.2f} с, '
+                  f'{written / elapsed:9.0f} партий/с, {size / written:6.1f} байт/партия')
+
+        start = perf_counter()
+        turns = sum(len(record.turns) for record in read_games(path))
+        elapsed = perf_counter() - start
+        # tracemalloc сильно замедляет чтение, поэтому память замеряется отдельно на части журнала
+        tracemalloc.start()
+        traced = sum(1 for _ in itertools.islice(read_games(path), 10000))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'чтение: {written} партий ({turns} ходов) за {elapsed:6.2f} с, {written / elapsed:9.0f} партий/с; '
+              f'пик памяти на {traced} партиях {peak / 1024:8.1f} КБ при файле {size / 1024:10.1f} КБ')
+
+        output = io.StringIO()
+        print(f'PDN: {timed(lambda i: output.write(game_to_pdn(records[i % distinct])), 10000):8.4f} мс на партию')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры производительности движка')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    allocations_parser = commands.add_parser('allocations', help='выделения памяти при переборе')
+    allocations_parser.add_argument('--depth', type=int, default=4)
+
+    parallel_parser = commands.add_parser('parallel', help='ускорение параллельного поиска')
+    parallel_parser.add_argument('--depth', type=int, default=5)
+    parallel_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parallel_parser.add_argument('--position', action='append', choices=list(POSITIONS),
+                                 help='тестовая позиция (по умолчанию start и midgame)')
+
+    latency_parser = commands.add_parser('latency', help='задержка интерфейса во время поиска')
+    latency_parser.add_argument('--depth', type=int, default=5)
+    latency_parser.add_argument('--position', action='append', choices=list(POSITIONS),
+                                help='тестовая позиция (по умолчанию start и midgame)')
+
+    ordering_parser = commands.add_parser('ordering', help='число узлов с упорядочиванием ходов и без')
+    ordering_parser.add_argument('--depth', type=int, default=6)
+    ordering_parser.add_argument('--position', action='append', choices=list(POSITIONS),
+                                 help='тестовая позиция (по умолчанию все)')
+
+    users_parser = commands.add_parser('users', help='вход и регистрация при большом числе пользователей')
+    users_parser.add_argument('--count', type=int, default=1000000)
+
+    commands.add_parser('hashing', help='стоимость хеширования паролей и задержка интерфейса')
+
+    notation_parser = commands.add_parser('notation', help='размер и скорость записи позиций')
+    notation_parser.add_argument('--count', type=int, default=10000)
+
+    gamelog_parser = commands.add_parser('gamelog', help='запись и чтение журнала партий')
+    gamelog_parser.add_argument('--count', type=int, default=1000000)
+    gamelog_parser.add_argument('--sync-every', type=int, nargs='+', default=[1, 64, 1024])
+
+    args = parser.parse_args()
+    if args.command == 'allocations':
+        allocations(args.depth)
+    elif args.command == 'parallel':
+        if not parallel(args.depth, args.workers, args.position or ['start', 'midgame']):
+            sys.exit(1)
+    elif args.command == 'latency':
+        latency(args.depth, args.position or ['start', 'midgame'])
+    elif args.command == 'ordering':
+        ordering(args.depth, args.position or list(POSITIONS))
+    elif args.command == 'users':
+        users(args.count)
+    elif args.command == 'hashing':
+        hashing()
+    elif args.command == 'notation':
+        notation(args.count)
+    elif args.command == 'gamelog':
+        gamelog(args.count, args.sync_every)
+
+
+if __name__ == '__main__':
+    main()
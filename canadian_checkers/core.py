@@ -0,0 +1,1041 @@
+'''Правила и состояние партии канадских шашек без графического интерфейса'''
+from enum import Enum, auto
+from typing import NamedTuple
+import random
+
+
+# Определение типов шашек и сторон
+class SideType(Enum):
+    WHITE = auto()
+    BLACK = auto()
+
+    @staticmethod
+    def opposite(side):
+        if side == SideType.WHITE:
+            return SideType.BLACK
+        elif side == SideType.BLACK:
+            return SideType.WHITE
+        else:
+            return None
+
+
+class CheckerType(Enum):
+    NONE = auto()
+    WHITE_REGULAR = auto()
+    BLACK_REGULAR = auto()
+    WHITE_QUEEN = auto()
+    BLACK_QUEEN = auto()
+
+
+# Определение точки
+class Point:
+    '''Клетка поля. Координаты не меняются после создания, поэтому точка может быть ключом словаря'''
+
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: int = -1, y: int = -1):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        if isinstance(other, Point):
+            return self.x == other.x and self.y == other.y
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __bool__(self):
+        '''Точка задана (Point() означает отсутствие клетки)'''
+        return self.x != -1 or self.y != -1
+
+
+# Определение движения
+class Move:
+    '''Перемещение шашки с клетки на клетку.
+
+    Координаты не меняются после создания, поэтому ходы можно хранить
+    в множествах и использовать как ключи словарей.
+    '''
+
+    __slots__ = ('from_x', 'from_y', 'to_x', 'to_y')
+
+    def __init__(self, from_x: int = -1, from_y: int = -1, to_x: int = -1, to_y: int = -1):
+        self.from_x = from_x
+        self.from_y = from_y
+        self.to_x = to_x
+        self.to_y = to_y
+
+    def __str__(self):
+        return f'{self.from_x}-{self.from_y} -> {self.to_x}-{self.to_y}'
+
+    def __repr__(self):
+        return f'{self.from_x}-{self.from_y} -> {self.to_x}-{self.to_y}'
+
+    def __eq__(self, other):
+        if isinstance(other, Move):
+            return (
+                    self.from_x == other.from_x and
+                    self.from_y == other.from_y and
+                    self.to_x == other.to_x and
+                    self.to_y == other.to_y
+            )
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.from_x, self.from_y, self.to_x, self.to_y))
+
+# Определение шашки
+class Checker:
+    def __init__(self, type: CheckerType = CheckerType.NONE):
+        self.__type = type
+
+    @property
+    def type(self):
+        return self.__type
+
+    def change_type(self, type: CheckerType):
+        '''Изменение типа шашки'''
+        self.__type = type
+
+
+# Определение шашки на клетке поля
+class FieldChecker(Checker):
+    '''Шашка на клетке поля: изменение типа сразу записывается в битовую доску'''
+
+    def __init__(self, board, x: int, y: int):
+        self.__board = board
+        self.__x = x
+        self.__y = y
+
+    @property
+    def type(self):
+        return self.__board.type_at(self.__x, self.__y)
+
+    def change_type(self, type: CheckerType):
+        '''Изменение типа шашки'''
+        self.__board.set_type_at(self.__x, self.__y, type)
+
+
+
+# Определение игровых констант
+X_SIZE = Y_SIZE = 12
+
+MOVE_OFFSETS = [
+    Point(-1, -1),
+    Point(1, -1),
+    Point(-1, 1),
+    Point(1, 1)
+]
+
+WHITE_CHECKERS = [CheckerType.WHITE_REGULAR, CheckerType.WHITE_QUEEN]
+BLACK_CHECKERS = [CheckerType.BLACK_REGULAR, CheckerType.BLACK_QUEEN]
+
+
+
+# Определение раскладки битовой доски
+class BoardLayout:
+    '''Раскладка тёмных клеток поля по битам целого числа.
+
+    Клетки нумеруются построчно, по x_size // 2 клеток в строке, а после каждой
+    пары строк пропускается один "призрачный" бит. Поэтому шаг по диагонали
+    всегда равен сдвигу на постоянное число бит, а выход за край поля
+    попадает в призрачный бит или за пределы маски поля.
+    '''
+
+    _cache = {}
+
+    def __init__(self, x_size: int, y_size: int):
+        if x_size % 2:
+            raise ValueError('Ширина поля должна быть чётной')
+
+        self.x_size = x_size
+        self.y_size = y_size
+        half = x_size // 2
+
+        # Сдвиги в том же порядке, что и MOVE_OFFSETS
+        self.shifts = (-(half + 1), -half, half, half + 1)
+
+        # Номер бита для каждой клетки (-1 для светлых) и обратное отображение
+        self.squares = [[-1] * x_size for _ in range(y_size)]
+        self.points = [None] * (y_size * half + y_size // 2 + 1)
+        self.mask = 0
+        self.white_end = 0
+        self.black_end = 0
+        self.white_start = 0
+        self.black_start = 0
+        self.rows = [0] * y_size
+
+        for y in range(y_size):
+            for x in range(x_size):
+                if (y + x) % 2:
+                    square = y * half + x // 2 + y // 2
+                    bit = 1 << square
+                    self.squares[y][x] = square
+                    self.points[square] = (x, y)
+                    self.mask |= bit
+                    self.rows[y] |= bit
+                    if y == 0:
+                        self.white_end |= bit
+                    if y == y_size - 1:
+                        self.black_end |= bit
+                    if y < 5:
+                        self.black_start |= bit
+                    elif y >= y_size - 5:
+                        self.white_start |= bit
+
+        # Лучи по диагоналям от каждой клетки до края поля (порядок, как в MOVE_OFFSETS):
+        # номера клеток по порядку удаления и маска всех клеток луча
+        self.rays = [None] * len(self.points)
+        self.ray_masks = [None] * len(self.points)
+        for square, point in enumerate(self.points):
+            if point is None:
+                continue
+            rays = []
+            for offset in MOVE_OFFSETS:
+                x, y = point[0] + offset.x, point[1] + offset.y
+                ray = []
+                while self.is_within(x, y):
+                    ray.append(self.squares[y][x])
+                    x, y = x + offset.x, y + offset.y
+                rays.append(tuple(ray))
+            self.rays[square] = tuple(rays)
+            self.ray_masks[square] = tuple(sum(1 << target for target in ray) for ray in rays)
+
+        # Ключи Zobrist: по случайному числу на каждый тип шашки на каждой клетке
+        # (порядок: белая, чёрная, белая дамка, чёрная дамка) и на ход чёрных
+        rnd = random.Random(f'zobrist-{x_size}x{y_size}')
+        self.zobrist = tuple([rnd.getrandbits(64) for _ in self.points] for _ in range(4))
+        self.zobrist_side = rnd.getrandbits(64)
+        # Те же ключи по байтам масок: для каждого типа шашки и каждого байта маски
+        # таблица из 256 значений - XOR ключей клеток, биты которых стоят в байте
+        self.hash_bytes = (len(self.points) + 7) // 8
+        padding = [0] * (self.hash_bytes * 8 - len(self.points))
+        self.zobrist_bytes = tuple([self._byte_table((keys + padding)[k * 8:k * 8 + 8]) for k in range(self.hash_bytes)]
+                                   for keys in self.zobrist)
+
+    @staticmethod
+    def _byte_table(keys: list[int]) -> list[int]:
+        '''XOR ключей восьми битов байта для каждого значения байта'''
+        table = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            table[value] = table[value ^ low] ^ keys[low.bit_length() - 1]
+        return table
+
+    def is_within(self, x: int, y: int) -> bool:
+        '''Определяет лежит ли точка в пределах поля'''
+        return (0 <= x < self.x_size and 0 <= y < self.y_size)
+
+    @classmethod
+    def get(cls, x_size: int, y_size: int) -> 'BoardLayout':
+        '''Раскладка для поля заданного размера (создаётся один раз)'''
+        layout = cls._cache.get((x_size, y_size))
+        if layout is None:
+            layout = cls._cache[(x_size, y_size)] = cls(x_size, y_size)
+        return layout
+
+
+# Определение битовой доски
+class BitBoard:
+    '''Битовое представление шашек: по одному целому числу на каждый тип шашки'''
+
+    def __init__(self, x_size: int, y_size: int):
+        self.layout = BoardLayout.get(x_size, y_size)
+        self.white_regular = 0
+        self.black_regular = 0
+        self.white_queen = 0
+        self.black_queen = 0
+        self.hash = 0
+        # Количество шашек каждого типа (порядок, как в BoardLayout.zobrist)
+        self.counts = [0, 0, 0, 0]
+
+    def generate(self):
+        '''Начальная расстановка шашек'''
+        self.white_regular = self.layout.white_start
+        self.black_regular = self.layout.black_start
+        self.white_queen = 0
+        self.black_queen = 0
+        self.hash = self.compute_hash()
+        self.counts = [checkers.bit_count() for checkers in (self.white_regular, self.black_regular,
+                                                             self.white_queen, self.black_queen)]
+
+    def compute_hash(self) -> int:
+        '''Хеш Zobrist, вычисленный заново по всем шашкам'''
+        value = 0
+        size = self.layout.hash_bytes
+        for tables, checkers in zip(self.layout.zobrist_bytes, (self.white_regular, self.black_regular,
+                                                                self.white_queen, self.black_queen)):
+            if checkers:
+                for table, byte in zip(tables, checkers.to_bytes(size, 'little')):
+                    value ^= table[byte]
+        return value
+
+    def side_hash(self, side: SideType) -> int:
+        '''Хеш позиции с учётом стороны, которая ходит'''
+        return self.hash ^ self.layout.zobrist_side if side == SideType.BLACK else self.hash
+
+    @classmethod
+    def from_masks(cls, x_size: int, y_size: int, white_regular: int, black_regular: int,
+                   white_queen: int, black_queen: int) -> 'BitBoard':
+        '''Доска по маскам шашек каждого типа'''
+        board = cls(x_size, y_size)
+        board.white_regular, board.black_regular = white_regular, black_regular
+        board.white_queen, board.black_queen = white_queen, black_queen
+        board.hash = board.compute_hash()
+        board.counts = [mask.bit_count() for mask in (white_regular, black_regular, white_queen, black_queen)]
+        return board
+
+    def copy(self) -> 'BitBoard':
+        '''Копия доски'''
+        board = BitBoard.__new__(BitBoard)
+        board.layout = self.layout
+        board.white_regular = self.white_regular
+        board.black_regular = self.black_regular
+        board.white_queen = self.white_queen
+        board.black_queen = self.black_queen
+        board.hash = self.hash
+        board.counts = self.counts.copy()
+        return board
+
+    @property
+    def white_count(self) -> int:
+        '''Количество белых шашек'''
+        return self.counts[0] + self.counts[2]
+
+    @property
+    def black_count(self) -> int:
+        '''Количество чёрных шашек'''
+        return self.counts[1] + self.counts[3]
+
+    @property
+    def white_score(self) -> int:
+        '''Счёт белых: простая шашка - 1, дамка - 3'''
+        return self.counts[0] + 3 * self.counts[2]
+
+    @property
+    def black_score(self) -> int:
+        '''Счёт чёрных: простая шашка - 1, дамка - 3'''
+        return self.counts[1] + 3 * self.counts[3]
+
+    @property
+    def white(self) -> int:
+        return self.white_regular | self.white_queen
+
+    @property
+    def black(self) -> int:
+        return self.black_regular | self.black_queen
+
+    @property
+    def empty(self) -> int:
+        return self.layout.mask & ~(self.white_regular | self.white_queen | self.black_regular | self.black_queen)
+
+    def type_of(self, square: int) -> CheckerType:
+        '''Тип шашки по номеру бита'''
+        bit = 1 << square
+        if bit & self.white_regular:
+            return CheckerType.WHITE_REGULAR
+        if bit & self.black_regular:
+            return CheckerType.BLACK_REGULAR
+        if bit & self.white_queen:
+            return CheckerType.WHITE_QUEEN
+        if bit & self.black_queen:
+            return CheckerType.BLACK_QUEEN
+        return CheckerType.NONE
+
+    def type_at(self, x: int, y: int) -> CheckerType:
+        '''Тип шашки по координатам'''
+        square = self.layout.squares[y][x]
+        if square < 0:
+            return CheckerType.NONE
+        return self.type_of(square)
+
+    def set_type(self, square: int, type: CheckerType):
+        '''Установка типа шашки по номеру бита'''
+        bit = 1 << square
+        keys = self.layout.zobrist
+        counts = self.counts
+
+        # Снимаем шашку, стоявшую на клетке
+        if bit & self.white_regular:
+            self.white_regular ^= bit
+            self.hash ^= keys[0][square]
+            counts[0] -= 1
+        elif bit & self.black_regular:
+            self.black_regular ^= bit
+            self.hash ^= keys[1][square]
+            counts[1] -= 1
+        elif bit & self.white_queen:
+            self.white_queen ^= bit
+            self.hash ^= keys[2][square]
+            counts[2] -= 1
+        elif bit & self.black_queen:
+            self.black_queen ^= bit
+            self.hash ^= keys[3][square]
+            counts[3] -= 1
+
+        if type == CheckerType.WHITE_REGULAR:
+            self.white_regular |= bit
+            self.hash ^= keys[0][square]
+            counts[0] += 1
+        elif type == CheckerType.BLACK_REGULAR:
+            self.black_regular |= bit
+            self.hash ^= keys[1][square]
+            counts[1] += 1
+        elif type == CheckerType.WHITE_QUEEN:
+            self.white_queen |= bit
+            self.hash ^= keys[2][square]
+            counts[2] += 1
+        elif type == CheckerType.BLACK_QUEEN:
+            self.black_queen |= bit
+            self.hash ^= keys[3][square]
+            counts[3] += 1
+
+    def set_type_at(self, x: int, y: int, type: CheckerType):
+        '''Установка типа шашки по координатам'''
+        square = self.layout.squares[y][x]
+        if square < 0:
+            if type != CheckerType.NONE:
+                raise ValueError('Шашки стоят только на тёмных клетках')
+            return
+        self.set_type(square, type)
+
+    def promote(self, square: int) -> bool:
+        '''Превращение простой шашки в дамку, если она стоит на последней горизонтали'''
+        bit = 1 << square
+        keys = self.layout.zobrist
+        if bit & self.white_regular & self.layout.white_end:
+            self.white_regular ^= bit
+            self.white_queen |= bit
+            self.hash ^= keys[0][square] ^ keys[2][square]
+            self.counts[0] -= 1
+            self.counts[2] += 1
+            return True
+        if bit & self.black_regular & self.layout.black_end:
+            self.black_regular ^= bit
+            self.black_queen |= bit
+            self.hash ^= keys[1][square] ^ keys[3][square]
+            self.counts[1] -= 1
+            self.counts[3] += 1
+            return True
+        return False
+
+    def _sides(self, side: SideType):
+        '''Простые шашки, дамки и шашки противника для стороны'''
+        if side == SideType.WHITE:
+            return self.white_regular, self.white_queen, self.black_regular | self.black_queen
+        if side == SideType.BLACK:
+            return self.black_regular, self.black_queen, self.white_regular | self.white_queen
+        return None
+
+    @staticmethod
+    def _first_on_ray(square: int, shift: int, blockers: int) -> int:
+        '''Номер ближайшей к клетке square занятой клетки луча (blockers - занятые клетки луча)'''
+        if shift > 0:
+            return (blockers & -blockers).bit_length() - 1
+        return blockers.bit_length() - 1
+
+    def _queen_captures(self, square: int, enemy: int, empty: int, moves_list: list):
+        '''Взятия дамкой: скольжение по пустым клеткам, шашка противника и пустые клетки за ней'''
+        layout = self.layout
+        points = layout.points
+        from_x, from_y = points[square]
+        occupied = layout.mask ^ empty
+        for shift, ray, ray_mask in zip(layout.shifts, layout.rays[square], layout.ray_masks[square]):
+            blockers = occupied & ray_mask
+            if not blockers:
+                continue
+            blocker = self._first_on_ray(square, shift, blockers)
+            if not (enemy >> blocker) & 1:
+                continue
+            # Все пустые клетки за шашкой противника
+            for target in ray[(blocker - square) // shift:]:
+                if not (empty >> target) & 1:
+                    break
+                to_x, to_y = points[target]
+                moves_list.append(Move(from_x, from_y, to_x, to_y))
+
+    def required_moves(self, side: SideType) -> list[Move]:
+        '''Список обязательных ходов (взятий) для стороны'''
+        moves_list = []
+        sides = self._sides(side)
+        if sides is None:
+            return moves_list
+
+        regular, queens, enemy = sides
+        empty = self.empty
+        points = self.layout.points
+
+        # Простые шашки бьют во все стороны через одну клетку
+        if regular:
+            for shift in self.layout.shifts:
+                if shift > 0:
+                    jumpers = regular & (enemy >> shift) & (empty >> 2 * shift)
+                else:
+                    jumpers = regular & (enemy << -shift) & (empty << -2 * shift)
+                while jumpers:
+                    bit = jumpers & -jumpers
+                    jumpers ^= bit
+                    square = bit.bit_length() - 1
+                    from_x, from_y = points[square]
+                    to_x, to_y = points[square + 2 * shift]
+                    moves_list.append(Move(from_x, from_y, to_x, to_y))
+
+        # Дамки
+        while queens:
+            bit = queens & -queens
+            queens ^= bit
+            self._queen_captures(bit.bit_length() - 1, enemy, empty, moves_list)
+
+        return moves_list
+
+    def required_moves_from(self, side: SideType, x: int, y: int) -> list[Move]:
+        '''Список обязательных ходов для шашки на клетке'''
+        moves_list = []
+        sides = self._sides(side)
+        square = self.layout.squares[y][x] if self.layout.is_within(x, y) else -1
+        if sides is None or square < 0:
+            return moves_list
+
+        regular, queens, enemy = sides
+        bit = 1 << square
+        if bit & regular:
+            empty = self.empty
+            points = self.layout.points
+            for shift in self.layout.shifts:
+                over = square + shift
+                to = over + shift
+                if over < 0 or to < 0:
+                    continue
+                if (enemy >> over) & 1 and (empty >> to) & 1:
+                    to_x, to_y = points[to]
+                    moves_list.append(Move(x, y, to_x, to_y))
+        elif bit & queens:
+            self._queen_captures(square, enemy, self.empty, moves_list)
+
+        return moves_list
+
+    def optional_moves(self, side: SideType) -> list[Move]:
+        '''Список необязательных (тихих) ходов для стороны'''
+        moves_list = []
+        sides = self._sides(side)
+        if sides is None:
+            return moves_list
+
+        regular, queens, _ = sides
+        empty = self.empty
+        points = self.layout.points
+        shifts = self.layout.shifts
+
+        # Простые шашки ходят только вперёд
+        if regular:
+            for shift in (shifts[:2] if side == SideType.WHITE else shifts[2:]):
+                if shift > 0:
+                    targets = (regular << shift) & empty
+                else:
+                    targets = (regular >> -shift) & empty
+                while targets:
+                    bit = targets & -targets
+                    targets ^= bit
+                    square = bit.bit_length() - 1
+                    from_x, from_y = points[square - shift]
+                    to_x, to_y = points[square]
+                    moves_list.append(Move(from_x, from_y, to_x, to_y))
+
+        # Дамки скользят по пустым клеткам луча до первой занятой клетки
+        occupied = self.layout.mask ^ empty
+        rays = self.layout.rays
+        ray_masks = self.layout.ray_masks
+        while queens:
+            queen = queens & -queens
+            queens ^= queen
+            square = queen.bit_length() - 1
+            from_x, from_y = points[square]
+            for shift, ray, ray_mask in zip(shifts, rays[square], ray_masks[square]):
+                blockers = occupied & ray_mask
+                if blockers:
+                    ray = ray[:(self._first_on_ray(square, shift, blockers) - square) // shift - 1]
+                for target in ray:
+                    to_x, to_y = points[target]
+                    moves_list.append(Move(from_x, from_y, to_x, to_y))
+
+        return moves_list
+
+    def has_moves(self, side: SideType) -> bool:
+        '''Есть ли у стороны хотя бы один ход. Списки ходов не строятся: проверка идёт
+        по маскам всех шашек сразу и останавливается на первом найденном ходе'''
+        if side == SideType.WHITE:
+            if not self.counts[0] and not self.counts[2]:
+                return False
+        elif side == SideType.BLACK:
+            if not self.counts[1] and not self.counts[3]:
+                return False
+        else:
+            return False
+
+        regular, queens, enemy = self._sides(side)
+        empty = self.empty
+        shifts = self.layout.shifts
+
+        # Тихие ходы простых шашек вперёд и дамок на соседнюю клетку
+        for shift in (shifts[:2] if side == SideType.WHITE else shifts[2:]):
+            if (regular << shift if shift > 0 else regular >> -shift) & empty:
+                return True
+        if queens:
+            for shift in shifts:
+                if (queens << shift if shift > 0 else queens >> -shift) & empty:
+                    return True
+
+        # Взятия простыми шашками
+        for shift in shifts:
+            if shift > 0:
+                jumpers = regular & (enemy >> shift) & (empty >> 2 * shift)
+            else:
+                jumpers = regular & (enemy << -shift) & (empty << -2 * shift)
+            if jumpers:
+                return True
+
+        # Взятия дамками
+        layout = self.layout
+        occupied = layout.mask ^ empty
+        while queens:
+            queen = queens & -queens
+            queens ^= queen
+            square = queen.bit_length() - 1
+            for shift, ray, ray_mask in zip(shifts, layout.rays[square], layout.ray_masks[square]):
+                blockers = occupied & ray_mask
+                if not blockers:
+                    continue
+                blocker = self._first_on_ray(square, shift, blockers)
+                index = (blocker - square) // shift
+                if (enemy >> blocker) & 1 and index < len(ray) and (empty >> ray[index]) & 1:
+                    return True
+        return False
+
+    def turns(self, side: SideType, unique: bool = False) -> list['Turn']:
+        '''Список ходов стороны целиком.
+
+        Ход продолжается той же шашкой, пока это требует GameState.play_move:
+        после взятия или по достижении последней горизонтали, если есть что бить.
+        Цепочки взятий строятся перебором в глубину на битовых масках, без
+        изменения доски. Если unique, из цепочек с одинаковым итогом (та же
+        конечная клетка и те же взятые шашки) остаётся одна.
+        '''
+        turns = []
+        sides = self._sides(side)
+        if sides is None:
+            return turns
+
+        _, queens, enemy = sides
+        layout = self.layout
+        squares = layout.squares
+        empty = self.empty
+        end = layout.white_end if side == SideType.WHITE else layout.black_end
+        seen = set() if unique else None
+
+        required_moves_list = self.required_moves(side)
+        for move in required_moves_list or self.optional_moves(side):
+            from_square = squares[move.from_y][move.from_x]
+            to_square = squares[move.to_y][move.to_x]
+            to_bit = 1 << to_square
+            queen = (queens >> from_square) & 1
+            if required_moves_list:
+                # Взятая шашка - ближайшая занятая клетка на пути
+                direction = (move.from_x < move.to_x) + 2 * (move.from_y < move.to_y)
+                blockers = (layout.mask ^ empty) & layout.ray_masks[from_square][direction]
+                captured = self._first_on_ray(from_square, layout.shifts[direction], blockers)
+                captured_bit = 1 << captured
+                self._extend_turn(queen, from_square, to_square, enemy ^ captured_bit,
+                                  (empty ^ to_bit) | (1 << from_square) | captured_bit,
+                                  [move], [captured], captured_bit, turns, seen)
+            elif to_bit & end:
+                # Дойдя до последней горизонтали, шашка продолжает ход, если может бить
+                self._extend_turn(queen, from_square, to_square, enemy, (empty ^ to_bit) | (1 << from_square),
+                                  [move], [], 0, turns, seen)
+            else:
+                turns.append(Turn((move,), from_square, to_square, (), 0))
+        return turns
+
+    def _extend_turn(self, queen: int, from_square: int, square: int, enemy: int, empty: int,
+                     moves: list[Move], captured: list[int], captured_mask: int, turns: list, seen: set):
+        '''Продолжение хода шашкой, стоящей на клетке square, при заданных масках противника и пустых клеток'''
+        hops = self._captures_from(square, queen, enemy, empty)
+        if not hops:
+            if seen is not None:
+                key = (from_square, square, captured_mask)
+                if key in seen:
+                    return
+                seen.add(key)
+            turns.append(Turn(tuple(moves), from_square, square, tuple(captured), captured_mask))
+            return
+
+        points = self.layout.points
+        from_x, from_y = points[square]
+        square_bit = 1 << square
+        for to_square, captured_square in hops:
+            to_x, to_y = points[to_square]
+            captured_bit = 1 << captured_square
+            moves.append(Move(from_x, from_y, to_x, to_y))
+            captured.append(captured_square)
+            self._extend_turn(queen, from_square, to_square, enemy ^ captured_bit,
+                              (empty ^ (1 << to_square)) | square_bit | captured_bit,
+                              moves, captured, captured_mask | captured_bit, turns, seen)
+            moves.pop()
+            captured.pop()
+
+    def _captures_from(self, square: int, queen: int, enemy: int, empty: int) -> list[tuple[int, int]]:
+        '''Взятия шашкой с клетки square: пары (клетка приземления, клетка взятой шашки)'''
+        hops = []
+        layout = self.layout
+        rays = layout.rays[square]
+        if not queen:
+            for ray in rays:
+                if len(ray) > 1 and (enemy >> ray[0]) & 1 and (empty >> ray[1]) & 1:
+                    hops.append((ray[1], ray[0]))
+            return hops
+
+        occupied = layout.mask ^ empty
+        for shift, ray, ray_mask in zip(layout.shifts, rays, layout.ray_masks[square]):
+            blockers = occupied & ray_mask
+            if not blockers:
+                continue
+            blocker = self._first_on_ray(square, shift, blockers)
+            if not (enemy >> blocker) & 1:
+                continue
+            for target in ray[(blocker - square) // shift:]:
+                if not (empty >> target) & 1:
+                    break
+                hops.append((target, blocker))
+        return hops
+
+    def make_move(self, move: Move, promote: bool = False) -> 'MoveUndo':
+        '''Обратимое выполнение хода: перемещение шашки, снятие всех шашек между начальной
+        и конечной клетками и, если promote, превращение в дамку на последней горизонтали'''
+        squares = self.layout.squares
+        from_square = squares[move.from_y][move.from_x]
+        to_square = squares[move.to_y][move.to_x]
+
+        # Клетки между начальной и конечной клетками
+        shift = self.layout.shifts[(move.from_x < move.to_x) + 2 * (move.from_y < move.to_y)]
+        between = 0
+        square = from_square + shift
+        while square != to_square:
+            between |= 1 << square
+            square += shift
+
+        return self._make(from_square, to_square, between, promote)
+
+    def make_turn(self, turn: 'Turn') -> 'MoveUndo':
+        '''Ход целиком: перемещение шашки, снятие всех взятых ею шашек и превращение в дамку в конце хода'''
+        return self._make(turn.from_square, turn.to_square, turn.captured_mask, True)
+
+    def _make(self, from_square: int, to_square: int, between: int, promote: bool) -> 'MoveUndo':
+        '''Перемещение шашки с from_square на to_square со снятием шашек на клетках between'''
+        keys = self.layout.zobrist
+        from_bit = 1 << from_square
+        # Цепочка взятий может закончиться на начальной клетке: тогда шашка остаётся на месте
+        move_bits = from_bit ^ (1 << to_square)
+        old_hash = self.hash
+
+        # Снятие шашек
+        captured = NO_CAPTURES
+        if between & (self.white_regular | self.black_regular | self.white_queen | self.black_queen):
+            captured = (self.white_regular & between, self.black_regular & between,
+                        self.white_queen & between, self.black_queen & between)
+            self.white_regular ^= captured[0]
+            self.black_regular ^= captured[1]
+            self.white_queen ^= captured[2]
+            self.black_queen ^= captured[3]
+            for index, checkers in enumerate(captured):
+                if checkers:
+                    self.counts[index] -= checkers.bit_count()
+                    kind_keys = keys[index]
+                    while checkers:
+                        bit = checkers & -checkers
+                        checkers ^= bit
+                        self.hash ^= kind_keys[bit.bit_length() - 1]
+
+        # Перемещение шашки
+        if from_bit & self.white_regular:
+            kind = 0
+            self.white_regular ^= move_bits
+        elif from_bit & self.black_regular:
+            kind = 1
+            self.black_regular ^= move_bits
+        elif from_bit & self.white_queen:
+            kind = 2
+            self.white_queen ^= move_bits
+        elif from_bit & self.black_queen:
+            kind = 3
+            self.black_queen ^= move_bits
+        else:
+            raise ValueError(f'Нет шашки на клетке {self.layout.points[from_square]}')
+        self.hash ^= keys[kind][from_square] ^ keys[kind][to_square]
+
+        promoted = promote and self.promote(to_square)
+
+        # Очки за съеденные шашки противника
+        if kind % 2:
+            points = captured[0].bit_count() + 3 * captured[2].bit_count()
+        else:
+            points = captured[1].bit_count() + 3 * captured[3].bit_count()
+
+        return MoveUndo(from_square, to_square, kind, captured, promoted, points, old_hash)
+
+    def unmake_move(self, undo: 'MoveUndo'):
+        '''Отмена хода, выполненного make_move'''
+        to_bit = 1 << undo.to_square
+        move_bits = (1 << undo.from_square) ^ to_bit
+        kind = undo.kind
+
+        counts = self.counts
+        if undo.promoted:
+            if kind == 0:
+                self.white_queen ^= to_bit
+                self.white_regular |= to_bit
+                counts[2] -= 1
+                counts[0] += 1
+            else:
+                self.black_queen ^= to_bit
+                self.black_regular |= to_bit
+                counts[3] -= 1
+                counts[1] += 1
+
+        if kind == 0:
+            self.white_regular ^= move_bits
+        elif kind == 1:
+            self.black_regular ^= move_bits
+        elif kind == 2:
+            self.white_queen ^= move_bits
+        else:
+            self.black_queen ^= move_bits
+
+        captured = undo.captured
+        if captured is not NO_CAPTURES:
+            self.white_regular |= captured[0]
+            self.black_regular |= captured[1]
+            self.white_queen |= captured[2]
+            self.black_queen |= captured[3]
+            for index, checkers in enumerate(captured):
+                counts[index] += checkers.bit_count()
+
+        self.hash = undo.hash
+
+    def unmake_turn(self, undo: 'MoveUndo'):
+        '''Отмена хода целиком, выполненного make_turn'''
+        self.unmake_move(undo)
+
+
+# Определение хода целиком
+class Turn(NamedTuple):
+    '''Ход целиком: перемещения шашки по порядку и клетки взятых ею шашек'''
+    moves: tuple
+    from_square: int
+    to_square: int
+    captured: tuple
+    captured_mask: int
+
+    def __str__(self):
+        first = self.moves[0]
+        return ' -> '.join([f'{first.from_x}-{first.from_y}'] + [f'{move.to_x}-{move.to_y}' for move in self.moves])
+
+
+# Определение записи для отмены хода
+NO_CAPTURES = (0, 0, 0, 0)
+
+
+class MoveUndo(NamedTuple):
+    '''Всё, что нужно для отмены хода: клетки хода, тип шашки (индекс, как в
+    BoardLayout.zobrist), маски снятых шашек по типам, превращение в дамку,
+    очки за ход и хеш доски до хода'''
+    from_square: int
+    to_square: int
+    kind: int
+    captured: tuple
+    promoted: bool
+    points: int
+    hash: int
+
+    @property
+    def has_captured(self) -> bool:
+        return self.captured is not NO_CAPTURES
+
+
+# Определение игрового поля
+class Field:
+    '''Игровое поле: представление битовой доски по координатам клеток'''
+
+    def __init__(self, x_size: int, y_size: int):
+        self.board = BitBoard(x_size, y_size)
+        self.generate()
+
+    @property
+    def x_size(self) -> int:
+        return self.board.layout.x_size
+
+    @property
+    def y_size(self) -> int:
+        return self.board.layout.y_size
+
+    @property
+    def size(self) -> int:
+        return max(self.x_size, self.y_size)
+
+    def generate(self):
+        '''Генерация поля с шашками и задаёт количество всего'''
+        self.board.generate()
+
+    def type_at(self, x: int, y: int) -> CheckerType:
+        '''Получение типа шашки на поле по координатам'''
+        return self.board.type_at(x, y)
+
+    def at(self, x: int, y: int) -> Checker:
+        '''Получение шашки на поле по координатам'''
+        return FieldChecker(self.board, x, y)
+
+    def is_within(self, x: int, y: int) -> bool:
+        '''Определяет лежит ли точка в пределах поля'''
+        return self.board.layout.is_within(x, y)
+
+    @property
+    def white_checkers_count(self) -> int:
+        '''Количество белых шашек на поле'''
+        return self.board.white_count
+
+    @property
+    def black_checkers_count(self) -> int:
+        '''Количество чёрных шашек на поле'''
+        return self.board.black_count
+
+    @property
+    def white_score(self) -> int:
+        '''Счёт белых'''
+        return self.board.white_score
+
+    @property
+    def black_score(self) -> int:
+        '''Счёт чёрных'''
+        return self.board.black_score
+
+
+# Определение партии
+class GameState:
+    '''Партия без интерфейса: поле, очередь хода, очки и правила хода.
+
+    Графический интерфейс и пакетный анализ работают с партией через этот класс.
+    '''
+
+    def __init__(self, x_field_size: int, y_field_size: int):
+        self.field = Field(x_field_size, y_field_size)
+
+        self.current_player = SideType.WHITE
+        # Шашка, которая должна продолжить ход (Point(), если ход только начинается)
+        self.continuing_cell = Point()
+
+        self.white_points = 0
+        self.black_points = 0
+
+        # Запись партии: начальная позиция и сделанные ходы целиком, каждый ход - пары
+        # (перемещение, было ли взятие); ход, который ещё продолжается, копится в turn_moves
+        self.start_board = self.field.board.copy()
+        self.start_player = self.current_player
+        self.history = []
+        self.turn_moves = []
+
+    def handle_move(self, move: Move) -> bool:
+        '''Совершение хода'''
+        # Изменение позиции шашки и удаление съеденных шашек
+        undo = self.field.board.make_move(move)
+
+        # Подсчет очков в зависимости от типа съеденных шашек
+        if self.current_player == SideType.WHITE:
+            self.white_points += undo.points
+        else:
+            self.black_points += undo.points
+
+        return undo.has_captured
+
+    def play_move(self, move: Move) -> bool:
+        '''Ход текущего игрока по правилам партии.
+
+        Возвращает True, если игрок должен продолжить ход той же шашкой.
+        '''
+        x, y = move.to_x, move.to_y
+
+        # Была ли убита шашка
+        has_killed_checker = self.handle_move(move)
+        self.turn_moves.append((move, has_killed_checker))
+
+        # Проверяем достижение последней линии
+        reached_end = (self.current_player == SideType.WHITE and y == 0) or \
+                     (self.current_player == SideType.BLACK and y == self.field.y_size - 1)
+
+        # Проверяем, есть ли обязательные ходы для текущей шашки
+        required_moves_list = self.get_required_moves_list_for_checker(self.current_player, x, y)
+
+        # Если есть обязательные ходы или достигнут край с возможностью взятия
+        if (has_killed_checker and required_moves_list) or (reached_end and required_moves_list):
+            # Игрок должен продолжать ходить той же шашкой
+            self.continuing_cell = Point(x, y)
+            return True
+        self.continuing_cell = Point()
+
+        # Если нет обязательных ходов, проверяем на превращение в дамку
+        if self.current_player == SideType.WHITE and y == 0 and self.field.type_at(x, y) == CheckerType.WHITE_REGULAR:
+            self.field.at(x, y).change_type(CheckerType.WHITE_QUEEN)
+        elif self.current_player == SideType.BLACK and y == self.field.y_size - 1 and self.field.type_at(x, y) == CheckerType.BLACK_REGULAR:
+            self.field.at(x, y).change_type(CheckerType.BLACK_QUEEN)
+
+        # Переключаем игрока
+        self.history.append(tuple(self.turn_moves))
+        self.turn_moves = []
+        self.current_player = SideType.opposite(self.current_player)
+        return False
+
+    def get_moves_index(self) -> tuple[dict, bool]:
+        '''Ходы текущего игрока: клетка шашки -> множество клеток, куда она может пойти,
+        и признак того, что это обязательные взятия'''
+        if self.continuing_cell:
+            moves_list = self.get_required_moves_list_for_checker(self.current_player, self.continuing_cell.x,
+                                                                  self.continuing_cell.y)
+            captures = True
+        else:
+            moves_list = self.get_required_moves_list(self.current_player)
+            captures = bool(moves_list)
+            if not captures:
+                moves_list = self.get_optional_moves_list(self.current_player)
+
+        index = {}
+        for move in moves_list:
+            targets = index.get((move.from_x, move.from_y))
+            if targets is None:
+                targets = index[(move.from_x, move.from_y)] = set()
+            targets.add((move.to_x, move.to_y))
+        return index, captures
+
+    def get_winner(self) -> SideType:
+        '''Победитель партии или None, если у обеих сторон есть ходы'''
+        if not self.field.board.has_moves(SideType.WHITE):
+            return SideType.BLACK
+        if not self.field.board.has_moves(SideType.BLACK):
+            return SideType.WHITE
+        return None
+
+    def get_required_moves_list_for_checker(self, side: SideType, x: int, y: int) -> list[Move]:
+        '''Получение списка обязательных ходов для конкретной шашки'''
+        return self.field.board.required_moves_from(side, x, y)
+
+    def get_moves_list(self, side: SideType) -> list[Move]:
+        '''Получение списка ходов'''
+        moves_list = self.get_required_moves_list(side)
+        if not (moves_list):
+            moves_list = self.get_optional_moves_list(side)
+        return moves_list
+
+    def get_required_moves_list(self, side: SideType) -> list[Move]:
+        '''Получение списка обязательных ходов'''
+        return self.field.board.required_moves(side)
+
+    def get_optional_moves_list(self, side: SideType) -> list[Move]:
+        '''Получение списка необязательных ходов'''
+        return self.field.board.optional_moves(side)
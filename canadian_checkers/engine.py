@@ -0,0 +1,424 @@
+'''Компьютерный противник: поиск альфа-бета с таблицей транспозиций'''
+from time import perf_counter
+
+from .core import SideType, Move, BitBoard, Turn
+
+# Определение констант поиска
+MAX_PREDICTION_DEPTH = 16
+ENGINE_TIME_LIMIT = 5.0
+ENGINE_SOFT_TIME_LIMIT = 1.0
+TT_SIZE_MB = 16
+
+# Оценка позиции компьютером (дамка ценится как три шашки, как и в подсчёте очков)
+REGULAR_VALUE = 100
+QUEEN_VALUE = 300
+ADVANCE_BONUS = 2
+WIN_SCORE = 100000
+
+# Порядок просмотра ходов: взятия, затем ходы-убийцы, затем остальные по истории отсечений
+CAPTURE_ORDER = 1 << 40
+KILLER_ORDER = 1 << 30
+MAX_PLY = 64
+
+# Типы оценок в таблице транспозиций
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
+
+# Определение кода хода
+def turn_code(turn: Turn) -> int:
+    '''Ход одним числом: клетки начала и конца и маска взятых шашек.
+    Так ход отличается от остальных ходов той же позиции с unique=True'''
+    return turn.from_square | turn.to_square << 8 | turn.captured_mask << 16
+
+
+def find_turn(turns: list[Turn], code: int) -> Turn:
+    '''Ход с кодом code среди turns или None'''
+    if code is not None:
+        for turn in turns:
+            if turn.from_square | turn.to_square << 8 | turn.captured_mask << 16 == code:
+                return turn
+    return None
+
+
+# Определение оценки позиции
+def evaluate(board: BitBoard, side: SideType) -> int:
+    '''Оценка позиции с точки зрения стороны side'''
+    counts = board.counts
+    score = REGULAR_VALUE * (counts[0] - counts[1]) + QUEEN_VALUE * (counts[2] - counts[3])
+
+    # Бонус за продвижение простых шашек к последней горизонтали
+    last_row = board.layout.y_size - 1
+    for y, row in enumerate(board.layout.rows):
+        score += ADVANCE_BONUS * ((board.white_regular & row).bit_count() * (last_row - y) -
+                                  (board.black_regular & row).bit_count() * y)
+
+    return score if side == SideType.WHITE else -score
+
+
+# Определение таблицы транспозиций
+class TranspositionTable:
+    '''Таблица транспозиций фиксированного размера.
+
+    Каждая корзина хранит две записи: первая заменяется только оценкой не меньшей
+    глубины (или записью из прошлого поиска), вторая заменяется всегда.
+    Запись - кортеж (ключ, глубина, тип оценки, оценка, код хода, номер поиска);
+    ход хранится числом (см. turn_code), а не объектом Turn, чтобы запись не
+    удерживала в памяти перемещения хода.
+    '''
+
+    # Размер одной записи в памяти вместе с ячейкой списка, байт (замерен tracemalloc
+    # при заполненной таблице: кортеж, ключ, оценка и код хода со взятиями)
+    ENTRY_SIZE = 176
+    SLOT_SIZE = 8
+
+    def __init__(self, size_mb: float = TT_SIZE_MB):
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * (self.ENTRY_SIZE + self.SLOT_SIZE)))
+        self.size = 1 << (buckets.bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        '''Очистка таблицы и статистики'''
+        self.depth_preferred = [None] * self.size
+        self.always_replace = [None] * self.size
+        self.used = 0
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        '''Начало нового поиска: старые записи можно вытеснять, статистика попаданий сбрасывается'''
+        self.generation += 1
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int):
+        '''Поиск записи по ключу'''
+        self.probes += 1
+        index = key & self.mask
+        entry = self.depth_preferred[index]
+        if entry is None or entry[0] != key:
+            entry = self.always_replace[index]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: int):
+        '''Сохранение оценки позиции; move - код лучшего хода (turn_code) или None'''
+        index = key & self.mask
+        entry = (key, depth, flag, score, move, self.generation)
+        old = self.depth_preferred[index]
+        if old is None or old[0] == key or depth >= old[1] or old[5] != self.generation:
+            # Вытесненная запись переезжает в ячейку постоянной замены
+            if old is not None and old[0] != key:
+                self._replace(index, old)
+            elif old is None:
+                self.used += 1
+            self.depth_preferred[index] = entry
+        else:
+            self._replace(index, entry)
+
+    def _replace(self, index: int, entry):
+        if self.always_replace[index] is None:
+            self.used += 1
+        self.always_replace[index] = entry
+
+    @property
+    def capacity(self) -> int:
+        return 2 * self.size
+
+    @property
+    def size_mb(self) -> float:
+        '''Объём таблицы в мегабайтах при полном заполнении'''
+        return self.capacity * (self.ENTRY_SIZE + self.SLOT_SIZE) / (1024 * 1024)
+
+    @property
+    def used_mb(self) -> float:
+        '''Объём, занятый таблицей сейчас, в мегабайтах'''
+        return (self.capacity * self.SLOT_SIZE + self.used * self.ENTRY_SIZE) / (1024 * 1024)
+
+    @property
+    def hit_rate(self) -> float:
+        '''Доля успешных обращений за текущий поиск'''
+        return self.hits / self.probes if self.probes else 0.0
+
+    @property
+    def fill(self) -> float:
+        '''Доля занятых записей'''
+        return self.used / self.capacity
+
+    def __str__(self):
+        return f'ТТ {self.size_mb:.0f} МБ: попаданий {self.hit_rate:.0%}, заполнено {self.fill:.1%}'
+
+
+# Определение результата поиска
+class SearchResult:
+    '''Результат поиска: ход целиком (со всеми взятиями), оценка, главная линия и статистика'''
+
+    def __init__(self, moves: list[Move], score: int, depth: int, nodes: int, elapsed: float,
+                 tt_hit_rate: float = 0.0, tt_fill: float = 0.0, pv: list[Turn] = None):
+        self.moves = moves
+        self.score = score
+        self.depth = depth
+        self.pv = pv if pv is not None else []
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.tt_hit_rate = tt_hit_rate
+        self.tt_fill = tt_fill
+
+    @property
+    def nps(self) -> int:
+        '''Скорость поиска в узлах в секунду'''
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def __str__(self):
+        return (f'глубина {self.depth}, оценка {self.score}, узлов {self.nodes}, {self.nps} уз/с, '
+                f'ТТ: попаданий {self.tt_hit_rate:.0%}, заполнено {self.tt_fill:.1%}')
+
+
+class SearchTimeout(Exception):
+    '''Время на ход исчерпано'''
+
+
+# Определение компьютерного противника
+class Engine:
+    '''Компьютерный противник: поиск negamax с альфа-бета отсечением и итеративным углублением.
+
+    Глубина поиска растёт на единицу, пока не достигнута depth. Новая итерация не
+    начинается после мягкого ограничения времени (soft_time_limit), а по жёсткому
+    (time_limit) текущая итерация прерывается. Главная линия каждой итерации
+    просматривается первой в следующей. С ordering=False ходы просматриваются в
+    порядке генератора (для сравнения числа узлов). Если задан on_iteration, он
+    вызывается с результатом каждой завершённой итерации.
+    '''
+
+    def __init__(self, depth: int = MAX_PREDICTION_DEPTH, time_limit: float = ENGINE_TIME_LIMIT,
+                 tt_size_mb: float = TT_SIZE_MB, soft_time_limit: float = ENGINE_SOFT_TIME_LIMIT,
+                 ordering: bool = True):
+        self.depth = depth
+        self.time_limit = time_limit
+        self.soft_time_limit = soft_time_limit
+        self.ordering = ordering
+        self.tt = TranspositionTable(tt_size_mb)
+        self.nodes = 0
+        self.deadline = 0.0
+        self.soft_deadline = 0.0
+        self.on_iteration = None
+        # Ходы главной линии прошлой итерации по ключам позиций
+        self.pv_turns = {}
+        self.clear_history()
+
+    def clear_history(self):
+        '''Сброс ходов-убийц (по два на полуход) и истории отсечений (по клеткам хода)'''
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {SideType.WHITE: {}, SideType.BLACK: {}}
+
+    def search(self, board: BitBoard, side: SideType, deadline: float = None,
+               soft_deadline: float = None) -> SearchResult:
+        '''Поиск лучшего хода в пределах времени на ход.
+
+        deadline и soft_deadline - моменты жёсткого и мягкого окончания поиска по perf_counter
+        (по умолчанию через time_limit и soft_time_limit). Их можно сдвинуть из другого потока,
+        поменяв self.deadline и self.soft_deadline во время поиска.
+        '''
+        start = perf_counter()
+        self.nodes = 0
+        self.deadline = start + self.time_limit if deadline is None else deadline
+        if soft_deadline is None:
+            soft_deadline = start + min(self.soft_time_limit, self.time_limit)
+        self.soft_deadline = soft_deadline
+        self.pv_turns = {}
+        self.clear_history()
+        self.tt.new_search()
+
+        # Поиск ведётся на своей копии доски: прерванный по времени поиск не отменяет ходы
+        board = board.copy()
+        turns = board.turns(side, unique=True)
+        best_moves = list(turns[0].moves) if turns else []
+        # Пока не просчитан ни один ход, оценка статическая; -WIN_SCORE - только при отсутствии ходов
+        best_score = evaluate(board, side) if turns else -WIN_SCORE
+        completed_depth = 0
+        pv = []
+
+        # Глубже MAX_PLY не хватит ходов-убийц
+        for depth in range(1, min(self.depth, MAX_PLY) + 1):
+            turn, score, completed = self._search_root(board, side, turns, depth)
+            if turn is not None:
+                # Из прерванной итерации берётся лучший из полностью просчитанных ходов:
+                # первым в ней считается лучший ход прошлой итерации
+                best_moves = list(turn.moves)
+                best_score = score
+            if not completed:
+                break
+            completed_depth = depth
+            pv = self._collect_pv(board, side, turn, depth)
+            if self.on_iteration is not None:
+                self.on_iteration(SearchResult(best_moves, best_score, depth, self.nodes, perf_counter() - start,
+                                               self.tt.hit_rate, self.tt.fill, pv))
+
+            # Единственный ход, найденный выигрыш или проигрыш углубление уже не изменит
+            if len(turns) <= 1 or abs(score) > WIN_SCORE // 2 or perf_counter() > self.soft_deadline:
+                break
+
+        return SearchResult(best_moves, best_score, completed_depth, self.nodes, perf_counter() - start,
+                            self.tt.hit_rate, self.tt.fill, pv)
+
+    def _search_root(self, board: BitBoard, side: SideType, turns: list[Turn], depth: int):
+        '''Итерация поиска из корня: лучший ход, его оценка и признак, что итерация завершена'''
+        turns = self._order_turns(board, side, turns, board.side_hash(side), 0)
+        best_turn = None
+        best_score = alpha = -WIN_SCORE
+
+        # При нехватке времени возвращаем лучший из полностью просчитанных ходов
+        try:
+            for turn in turns:
+                score = self.search_turn(board, side, turn, alpha, depth)
+                if score > best_score:
+                    best_score = score
+                    best_turn = turn
+                alpha = max(alpha, score)
+        except SearchTimeout:
+            return best_turn, best_score, False
+        return best_turn, best_score, True
+
+    def _collect_pv(self, board: BitBoard, side: SideType, turn: Turn, depth: int) -> list[Turn]:
+        '''Главная линия по таблице транспозиций; её ходы запоминаются для следующей итерации'''
+        pv = []
+        undos = []
+        self.pv_turns = {}
+        while turn is not None and len(pv) < depth:
+            self.pv_turns[board.side_hash(side)] = turn
+            pv.append(turn)
+            undos.append(board.make_turn(turn))
+            side = SideType.opposite(side)
+            entry = self.tt.probe(board.side_hash(side))
+            turn = find_turn(board.turns(side, unique=True), entry[4]) if entry is not None else None
+        for undo in reversed(undos):
+            board.unmake_turn(undo)
+        return pv
+
+    def _order_turns(self, board: BitBoard, side: SideType, turns: list[Turn], key: int, ply: int,
+                     tt_move: int = None) -> list[Turn]:
+        '''Порядок просмотра ходов: ход главной линии или из таблицы транспозиций, взятия по
+        стоимости взятых шашек (дамка - как три шашки), ходы-убийцы, остальные по истории'''
+        if not self.ordering or len(turns) < 2:
+            return turns
+
+        queens = board.white_queen | board.black_queen
+        killers = self.killers[ply]
+        history = self.history[side]
+
+        def order(turn: Turn) -> int:
+            if turn.captured:
+                return CAPTURE_ORDER + len(turn.captured) + 2 * (turn.captured_mask & queens).bit_count()
+            squares = (turn.from_square, turn.to_square)
+            if squares == killers[0]:
+                return KILLER_ORDER + 1
+            if squares == killers[1]:
+                return KILLER_ORDER
+            return history.get(squares, 0)
+
+        # При равенстве сохраняется порядок генератора
+        turns = sorted(turns, key=order, reverse=True)
+        first = self.pv_turns.get(key) or find_turn(turns, tt_move)
+        if first is not None and first != turns[0] and first in turns:
+            turns.remove(first)
+            turns.insert(0, first)
+        return turns
+
+    def _store_cutoff(self, side: SideType, turn: Turn, depth: int, ply: int):
+        '''Запоминание тихого хода, давшего отсечение'''
+        squares = (turn.from_square, turn.to_square)
+        killers = self.killers[ply]
+        if killers[0] != squares:
+            killers[1] = killers[0]
+            killers[0] = squares
+        history = self.history[side]
+        history[squares] = history.get(squares, 0) + depth * depth
+
+    def search_turn(self, board: BitBoard, side: SideType, turn: Turn, alpha: int = -WIN_SCORE,
+                    depth: int = None) -> int:
+        '''Оценка хода из корня на глубину depth (по умолчанию self.depth).
+        Для ходов не лучше alpha оценка - лишь верхняя граница'''
+        if depth is None:
+            depth = self.depth
+        undo = board.make_turn(turn)
+        score = -self._negamax(board, SideType.opposite(side), depth - 1, -WIN_SCORE, -alpha, 1)
+        board.unmake_turn(undo)
+        return score
+
+    def _negamax(self, board: BitBoard, side: SideType, depth: int, alpha: int, beta: int, ply: int) -> int:
+        '''Оценка позиции поиском negamax с альфа-бета отсечением'''
+        self.nodes += 1
+        if not self.nodes & 1023 and perf_counter() > self.deadline:
+            raise SearchTimeout
+
+        if depth <= 0:
+            # Сторона без ходов проиграла, даже если по материалу она впереди
+            if not board.has_moves(side):
+                return -WIN_SCORE + ply
+            return evaluate(board, side)
+
+        # Оценка из таблицы транспозиций
+        key = board.side_hash(side)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            if entry[1] >= depth:
+                score = self._score_from_tt(entry[3], ply)
+                flag = entry[2]
+                if flag == TT_EXACT or (flag == TT_LOWER and score >= beta) or (flag == TT_UPPER and score <= alpha):
+                    return score
+            tt_move = entry[4]
+
+        turns = board.turns(side, unique=True)
+        # Сторона без ходов проиграла
+        if not turns:
+            return -WIN_SCORE + ply
+        turns = self._order_turns(board, side, turns, key, ply, tt_move)
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE
+        best_turn = None
+        for turn in turns:
+            undo = board.make_turn(turn)
+            score = -self._negamax(board, SideType.opposite(side), depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_turn(undo)
+            if score > best_score:
+                best_score = score
+                best_turn = turn
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not turn.captured:
+                            self._store_cutoff(side, turn, depth, ply)
+                        break
+
+        if best_score <= original_alpha:
+            flag = TT_UPPER
+        elif best_score >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        self.tt.store(key, depth, flag, self._score_to_tt(best_score, ply), turn_code(best_turn))
+        return best_score
+
+    @staticmethod
+    def _score_to_tt(score: int, ply: int) -> int:
+        '''Оценка выигрыша хранится относительно позиции, а не корня поиска'''
+        if score > WIN_SCORE // 2:
+            return score + ply
+        if score < -WIN_SCORE // 2:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score: int, ply: int) -> int:
+        if score > WIN_SCORE // 2:
+            return score - ply
+        if score < -WIN_SCORE // 2:
+            return score + ply
+        return score
@@ -0,0 +1,342 @@
+'''Журнал сыгранных партий
+
+Партии дописываются в конец двоичного файла и никогда не переписываются.
+Файл начинается с сигнатуры, за ней идут записи: метка GR, длина и
+контрольная сумма CRC32 содержимого, затем само содержимое - размер поля,
+время записи, победитель, начальная позиция (двоичная запись модуля notation)
+и ходы целиком. Ход - число перемещений, клетка начала хода и клетки, куда
+шашка перемещалась; у клетки старший бит отмечает перемещение со взятием.
+Клетки записываются номерами тёмных клеток, как в notation.
+
+Записи копятся в памяти и отдаются системе одним вызовом write, поэтому
+несколько программ могут дописывать в один файл, не перемешивая записи.
+fsync вызывается не после каждой партии, а пачками: после sync_every партий
+или при первой записи спустя sync_interval секунд после предыдущего fsync,
+а также при закрытии журнала.
+
+Журнал читается генератором read_games по кускам, так что можно перебрать
+миллионы партий, не загружая файл в память. Запись, оборванная при сбое или
+испорченная, пропускается: чтение продолжается со следующей метки GR с верной
+контрольной суммой. game_to_pdn и export_pdn переводят партии в текст,
+похожий на PDN.
+'''
+import atexit
+import os
+import struct
+import threading
+import zlib
+from time import perf_counter, time, localtime, strftime
+from typing import NamedTuple
+
+from .core import SideType, Move, BitBoard, GameState
+from .notation import PositionCodec, encode_position, decode_position
+
+# Определение констант журнала
+GAME_LOG_PATH = 'games.log'
+GAME_LOG_SYNC_EVERY = 64
+GAME_LOG_SYNC_INTERVAL = 5.0
+GAME_LOG_BUFFER_SIZE = 1 << 20
+GAME_LOG_CHUNK_SIZE = 1 << 20
+
+# Сигнатура файла, метка записи и заголовки: (метка, длина, CRC32) и
+# (ширина поля, высота поля, время записи, победитель, число ходов)
+LOG_MAGIC = b'CCGL\x01'
+RECORD_MARKER = b'GR'
+RECORD_HEADER = struct.Struct('<2sII')
+GAME_HEADER = struct.Struct('<BBdBH')
+MAX_RECORD_SIZE = 1 << 20
+CAPTURE_FLAG = 0x80
+
+# Победитель в записи: 0 - партия не окончена
+WINNER_CODES = {None: 0, SideType.WHITE: 1, SideType.BLACK: 2}
+WINNERS = {code: side for side, code in WINNER_CODES.items()}
+
+# Номер вида игры и результаты в PDN
+PDN_GAME_TYPE = 27
+PDN_RESULTS = {None: '*', SideType.WHITE: '2-0', SideType.BLACK: '0-2'}
+PDN_LINE_LENGTH = 79
+
+
+# Определение записанной партии
+class GameRecord(NamedTuple):
+    '''Записанная партия: размер поля, начальная позиция (двоичная запись
+    notation), ходы целиком - кортежи пар (перемещение, было ли взятие),
+    победитель (None, если партия не окончена) и время записи'''
+    x_size: int
+    y_size: int
+    start: bytes
+    turns: tuple
+    winner: SideType
+    time: float
+
+    @property
+    def position(self) -> tuple[BitBoard, SideType]:
+        '''Начальная позиция и очередь хода'''
+        return decode_position(self.start, self.x_size, self.y_size)
+
+
+def record_from_game(game: GameState, winner: SideType = None) -> GameRecord:
+    '''Запись партии по её ходам; ход, который ещё не закончен, не записывается'''
+    return GameRecord(game.field.x_size, game.field.y_size, encode_position(game.start_board, game.start_player),
+                      tuple(game.history), winner, time())
+
+
+# Таблицы для записи и чтения ходов на поле заданного размера: номер клетки по y * x_size + x и
+# для каждой клетки начала перемещения - пары (перемещение, было ли взятие) по байту клетки конца.
+# Одни и те же объекты Move используются для всех прочитанных партий.
+_tables = {}
+
+
+def _get_tables(codec: PositionCodec) -> tuple[list, list]:
+    tables = _tables.get(codec)
+    if tables is None:
+        x_size = codec.layout.x_size
+        cells = [-1] * (x_size * codec.layout.y_size)
+        steps = []
+        for number, (x, y) in enumerate(codec.points):
+            cells[y * x_size + x] = number
+            targets = {}
+            for target, point in enumerate(codec.points):
+                move = Move(x, y, *point)
+                targets[target] = (move, False)
+                targets[target | CAPTURE_FLAG] = (move, True)
+            steps.append(targets)
+        tables = _tables[codec] = (cells, steps)
+    return tables
+
+
+def encode_record(record: GameRecord) -> bytes:
+    '''Содержимое записи журнала'''
+    cells, _ = _get_tables(PositionCodec.get(record.x_size, record.y_size))
+    x_size = record.x_size
+    data = bytearray(GAME_HEADER.pack(record.x_size, record.y_size, record.time, WINNER_CODES[record.winner],
+                                      len(record.turns)))
+    data += record.start
+    append = data.append
+    for turn in record.turns:
+        first = turn[0][0]
+        append(len(turn))
+        append(cells[first.from_y * x_size + first.from_x])
+        for move, captured in turn:
+            append(cells[move.to_y * x_size + move.to_x] | (CAPTURE_FLAG if captured else 0))
+    return bytes(data)
+
+
+def decode_record(data: bytes) -> GameRecord:
+    '''Партия по содержимому записи журнала'''
+    x_size, y_size, recorded, winner, count = GAME_HEADER.unpack_from(data)
+    codec = PositionCodec.get(x_size, y_size)
+    _, steps = _get_tables(codec)
+    offset = GAME_HEADER.size + codec.size
+    start = bytes(data[GAME_HEADER.size:offset])
+
+    turns = []
+    for _ in range(count):
+        length = data[offset]
+        if length == 1:
+            # Большинство ходов - одно перемещение
+            turns.append((steps[data[offset + 1]][data[offset + 2]],))
+        else:
+            square = data[offset + 1]
+            turn = []
+            for cell in data[offset + 2:offset + 2 + length]:
+                turn.append(steps[square][cell])
+                square = cell & ~CAPTURE_FLAG
+            turns.append(tuple(turn))
+        offset += length + 2
+    if offset != len(data):
+        raise ValueError('Неверная длина записи партии')
+    return GameRecord(x_size, y_size, start, tuple(turns), WINNERS[winner], recorded)
+
+
+# Определение журнала
+class GameLog:
+    '''Журнал партий, открытый на дописывание'''
+
+    def __init__(self, path: str = GAME_LOG_PATH, sync_every: int = GAME_LOG_SYNC_EVERY,
+                 sync_interval: float = GAME_LOG_SYNC_INTERVAL):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        # Обращения из разных потоков идут по очереди
+        self.lock = threading.Lock()
+        self.file = open(path, 'ab', buffering=0)
+        self.buffer = bytearray()
+        if self.file.tell() == 0:
+            self.buffer += LOG_MAGIC
+        self.pending = 0  # Партий, записанных после последнего fsync
+        self.last_sync = perf_counter()
+
+    def append(self, record: GameRecord):
+        '''Добавление партии в конец журнала'''
+        payload = encode_record(record)
+        with self.lock:
+            self.buffer += RECORD_HEADER.pack(RECORD_MARKER, len(payload), zlib.crc32(payload))
+            self.buffer += payload
+            self.pending += 1
+            if self.pending >= self.sync_every or perf_counter() - self.last_sync >= self.sync_interval:
+                self._sync()
+            elif len(self.buffer) >= GAME_LOG_BUFFER_SIZE:
+                self._flush()
+
+    def flush(self):
+        '''Передача накопленных партий системе (без fsync): они переживут падение программы'''
+        with self.lock:
+            self._flush()
+
+    def sync(self):
+        '''Запись накопленных партий на диск'''
+        with self.lock:
+            self._sync()
+
+    def close(self):
+        '''Запись накопленных партий на диск и закрытие журнала'''
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush(self):
+        # Вызывается под блокировкой
+        view = memoryview(self.buffer)
+        while view:
+            view = view[self.file.write(view):]
+        view.release()
+        self.buffer.clear()
+
+    def _sync(self):
+        # Вызывается под блокировкой
+        self._flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = perf_counter()
+
+
+def read_games(path: str = GAME_LOG_PATH, chunk_size: int = GAME_LOG_CHUNK_SIZE):
+    '''Генератор партий журнала по порядку записи; в памяти держится только текущий кусок файла'''
+    with open(path, 'rb') as file:
+        if file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise ValueError(f'{path} - не журнал партий')
+
+        data = bytearray()
+        position = 0
+        eof = False
+
+        def available(size: int) -> bool:
+            '''Есть ли в куске size байт начиная с position (при необходимости дочитывается файл)'''
+            nonlocal data, position, eof
+            while len(data) - position < size and not eof:
+                del data[:position]
+                position = 0
+                chunk = file.read(max(chunk_size, size))
+                eof = not chunk
+                data += chunk
+            return len(data) - position >= size
+
+        while available(RECORD_HEADER.size):
+            marker, length, checksum = RECORD_HEADER.unpack_from(data, position)
+            # Если содержимое не дочитывается до конца файла, запись оборвана или её длина
+            # испорчена: за ней могут быть целые записи, дописанные после сбоя
+            if (marker == RECORD_MARKER and length <= MAX_RECORD_SIZE
+                    and available(RECORD_HEADER.size + length)):
+                start = position + RECORD_HEADER.size
+                payload = bytes(data[start:start + length])
+                if zlib.crc32(payload) == checksum:
+                    try:
+                        record = decode_record(payload)
+                    except (ValueError, KeyError, IndexError, struct.error):
+                        record = None
+                    if record is not None:
+                        position = start + length
+                        yield record
+                        continue
+
+            # Испорченная запись: поиск следующей метки
+            found = data.find(RECORD_MARKER, position + 1)
+            while found < 0 and not eof:
+                # Метка могла попасть на границу кусков: её начало остаётся в куске
+                position = len(data) - len(RECORD_MARKER) + 1
+                available(len(RECORD_MARKER))
+                found = data.find(RECORD_MARKER, position)
+            if found < 0:
+                return
+            position = found
+
+
+# Журнал по умолчанию открывается при первом обращении и закрывается при выходе из программы
+_default_log = None
+_default_log_lock = threading.Lock()
+
+
+def get_game_log() -> GameLog:
+    '''Журнал партий по умолчанию'''
+    global _default_log
+    with _default_log_lock:
+        if _default_log is None:
+            _default_log = GameLog(GAME_LOG_PATH)
+            atexit.register(_default_log.close)
+        return _default_log
+
+
+def set_game_log(log: GameLog):
+    '''Замена журнала по умолчанию'''
+    global _default_log
+    with _default_log_lock:
+        _default_log = log
+
+
+def _turn_to_pdn(codec: PositionCodec, turn: tuple) -> str:
+    '''Ход в записи PDN: номера клеток через минус, а при взятии - через x'''
+    first = turn[0][0]
+    return str(codec.numbers[(first.from_x, first.from_y)] + 1) + ''.join(
+        f'{"x" if captured else "-"}{codec.numbers[(move.to_x, move.to_y)] + 1}' for move, captured in turn)
+
+
+def game_to_pdn(record: GameRecord) -> str:
+    '''Партия в виде, похожем на PDN: теги и ходы с номерами'''
+    codec = PositionCodec.get(record.x_size, record.y_size)
+    result = PDN_RESULTS[record.winner]
+    tags = [('GameType', str(PDN_GAME_TYPE)), ('Date', strftime('%Y.%m.%d', localtime(record.time))),
+            ('Result', result)]
+    board, side = record.position
+    initial = BitBoard(record.x_size, record.y_size)
+    initial.generate()
+    if record.start != codec.encode(initial, SideType.WHITE):
+        tags.append(('FEN', codec.to_fen(board, side)))
+
+    words = []
+    ply = 0 if side == SideType.WHITE else 1
+    if ply:
+        words.append('1...')
+    for turn in record.turns:
+        if ply % 2 == 0:
+            words.append(f'{ply // 2 + 1}.')
+        words.append(_turn_to_pdn(codec, turn))
+        ply += 1
+    words.append(result)
+
+    lines = [f'[{name} "{value}"]' for name, value in tags]
+    line = ''
+    for word in words:
+        if line and len(line) + 1 + len(word) > PDN_LINE_LENGTH:
+            lines.append(line)
+            line = word
+        else:
+            line = f'{line} {word}' if line else word
+    lines.append(line)
+    return '\n'.join(lines)
+
+
+def export_pdn(path: str, output) -> int:
+    '''Все партии журнала в виде PDN в текстовый поток output; возвращает число партий'''
+    count = 0
+    for record in read_games(path):
+        output.write(game_to_pdn(record) + '\n\n')
+        count += 1
+    return count
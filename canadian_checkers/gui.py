@@ -1,346 +1,377 @@
+'''Графический интерфейс игры на tkinter'''
+import sys
 import tkinter as tk
 from tkinter import messagebox
-from enum import Enum, auto
 from PIL import Image, ImageTk
 from pathlib import Path
-from time import sleep
-import json
-import hashlib
-
-# Определение типов шашек и сторон
-class SideType(Enum):
-    WHITE = auto()
-    BLACK = auto()
-
-    @staticmethod
-    def opposite(side):
-        if side == SideType.WHITE:
-            return SideType.BLACK
-        elif side == SideType.BLACK:
-            return SideType.WHITE
-        else:
-            return None
-
-
-class CheckerType(Enum):
-    NONE = auto()
-    WHITE_REGULAR = auto()
-    BLACK_REGULAR = auto()
-    WHITE_QUEEN = auto()
-    BLACK_QUEEN = auto()
-
-
-# Определение точки
-class Point:
-    def __init__(self, x: int = -1, y: int = -1):
-        self.__x = x
-        self.__y = y
-
-    @property
-    def x(self):
-        return self.__x
-
-    @property
-    def y(self):
-        return self.__y
-
-    def __eq__(self, other):
-        if isinstance(other, Point):
-            return self.x == other.x and self.y == other.y
-        return NotImplemented
-
-
-# Определение движения
-class Move:
-    def __init__(self, from_x: int = -1, from_y: int = -1, to_x: int = -1, to_y: int = -1):
-        self._from_x = from_x
-        self._from_y = from_y
-        self._to_x = to_x
-        self._to_y = to_y
+from time import perf_counter
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-    @property
-    def from_x(self):
-        return self._from_x
-
-    @property
-    def from_y(self):
-        return self._from_y
+from .core import SideType, CheckerType, Point, Move, GameState, X_SIZE, Y_SIZE, WHITE_CHECKERS, BLACK_CHECKERS
+from .engine import Engine
+from .gamelog import get_game_log, record_from_game
+from .worker import EngineWorker
+from .users import check_user, register_user
 
-    @property
-    def to_x(self):
-        return self._to_x
-
-    @property
-    def to_y(self):
-        return self._to_y
-
-    def __str__(self):
-        return f'{self._from_x}-{self._from_y} -> {self._to_x}-{self._to_y}'
-
-    def __repr__(self):
-        return f'{self._from_x}-{self._from_y} -> {self._to_x}-{self._to_y}'
-
-    def __eq__(self, other):
-        if isinstance(other, Move):
-            return (
-                    self._from_x == other._from_x and
-                    self._from_y == other._from_y and
-                    self._to_x == other._to_x and
-                    self._to_y == other._to_y
-            )
-        return NotImplemented
-
-# Определение шашки
-class Checker:
-    def __init__(self, type: CheckerType = CheckerType.NONE):
-        self.__type = type
-
-    @property
-    def type(self):
-        return self.__type
-
-    def change_type(self, type: CheckerType):
-        '''Изменение типа шашки'''
-        self.__type = type
-
-
-# Определение игровых констант
+# Определение констант интерфейса
 PLAYER_SIDE = SideType.WHITE
-X_SIZE = Y_SIZE = 12
 CELL_SIZE = 75
 ANIMATION_SPEED = 4
-MAX_PREDICTION_DEPTH = 3
+ANIMATION_FPS = 60
+SPRITE_CACHE_SIZE = 4
+RESIZE_DELAY = 100
+ENGINE_POLL_DELAY = 20
+AUTH_POLL_DELAY = 20
 BORDER_WIDTH = 2 * 2
 FIELD_COLORS = ['#E7CFA9', '#927456']
 HOVER_BORDER_COLOR = '#54b346'
 SELECT_BORDER_COLOR = '#944444'
 POSIBLE_MOVE_CIRCLE_COLOR = '#944444'
+MOVABLE_BORDER_COLOR = '#d9a441'
 
-MOVE_OFFSETS = [
-    Point(-1, -1),
-    Point(1, -1),
-    Point(-1, 1),
-    Point(1, 1)
-]
 
-WHITE_CHECKERS = [CheckerType.WHITE_REGULAR, CheckerType.WHITE_QUEEN]
-BLACK_CHECKERS = [CheckerType.BLACK_REGULAR, CheckerType.BLACK_QUEEN]
+# Определение кэша изображений шашек
+class SpriteCache:
+    '''Изображения шашек для холста.
 
+    Исходные PNG читаются из assets один раз на процесс, а уменьшенные под
+    размер клетки PhotoImage хранятся для SPRITE_CACHE_SIZE последних размеров.
+    '''
 
-# Определение игрового поля
-class Field:
-    def __init__(self, x_size: int, y_size: int):
-        self.__x_size = x_size
-        self.__y_size = y_size
-        self.generate()
+    FILES = {
+        CheckerType.WHITE_REGULAR: 'white-regular.png',
+        CheckerType.BLACK_REGULAR: 'black-regular.png',
+        CheckerType.WHITE_QUEEN: 'white-queen.png',
+        CheckerType.BLACK_QUEEN: 'black-queen.png',
+    }
 
-    @property
-    def x_size(self) -> int:
-        return self.__x_size
+    _sources = None
+
+    def __init__(self, master: tk.Misc, max_sizes: int = SPRITE_CACHE_SIZE):
+        self.master = master
+        self.max_sizes = max_sizes
+        self.sprites = OrderedDict()
+
+    @classmethod
+    def sources(cls) -> dict:
+        '''Исходные изображения (читаются и декодируются один раз)'''
+        if cls._sources is None:
+            cls._sources = {}
+            for checker_type, name in cls.FILES.items():
+                image = Image.open(Path('assets', name))
+                image.load()
+                cls._sources[checker_type] = image
+        return cls._sources
+
+    def get(self, size: int) -> dict:
+        '''Изображения шашек размером size x size'''
+        sprites = self.sprites.get(size)
+        if sprites is not None:
+            self.sprites.move_to_end(size)
+            return sprites
+
+        sprites = {checker_type: ImageTk.PhotoImage(image.resize((size, size), Image.LANCZOS), master=self.master)
+                   for checker_type, image in self.sources().items()}
+        self.sprites[size] = sprites
+        while len(self.sprites) > self.max_sizes:
+            self.sprites.popitem(last=False)
+        return sprites
+
+
+# Определение анимации ходов
+class MoveAnimator:
+    '''Анимация перемещения шашек по холсту через after(), не блокирующая цикл событий Tk.
+
+    Перемещения ставятся в очередь и проигрываются по одному, поэтому цепочка
+    взятий показывается ход за ходом. Положение изображения вычисляется по
+    прошедшему времени, так что пропущенные кадры не замедляют анимацию.
+    '''
+
+    def __init__(self, canvas: tk.Canvas, fps: int = ANIMATION_FPS):
+        self.canvas = canvas
+        self.frame_delay = max(1, 1000 // fps)
+        self.queue = deque()
+        self.current = None
+        self.after_id = None
 
     @property
-    def y_size(self) -> int:
-        return self.__y_size
+    def is_running(self) -> bool:
+        return self.current is not None or bool(self.queue)
+
+    def animate(self, image, move: Move, on_done=None):
+        '''Добавление перемещения в очередь анимации'''
+        self.queue.append((image, move, on_done))
+        if self.current is None:
+            self._start_next()
+
+    def cancel(self):
+        '''Остановка текущей анимации и очистка очереди'''
+        if self.after_id is not None:
+            self.canvas.after_cancel(self.after_id)
+            self.after_id = None
+        if self.current is not None:
+            self.canvas.delete(self.current[0])
+            self.current = None
+        self.queue.clear()
+
+    def _start_next(self):
+        if not self.queue:
+            return
+        image, move, on_done = self.queue.popleft()
+        item = self.canvas.create_image(move.from_x * CELL_SIZE, move.from_y * CELL_SIZE, image=image,
+                                        anchor='nw', tag='animated_checker')
+
+        # ANIMATION_SPEED - процентов клетки за 10 мс, то есть клеток в секунду
+        duration = abs(move.from_x - move.to_x) / ANIMATION_SPEED
+        self.current = (item, move, perf_counter(), duration, on_done)
+        self._frame()
+
+    def _frame(self):
+        item, move, start, duration, on_done = self.current
+        progress = min(1.0, (perf_counter() - start) / duration) if duration > 0 else 1.0
+        self.canvas.coords(item, (move.from_x + (move.to_x - move.from_x) * progress) * CELL_SIZE,
+                           (move.from_y + (move.to_y - move.from_y) * progress) * CELL_SIZE)
+
+        if progress < 1.0:
+            self.after_id = self.canvas.after(self.frame_delay, self._frame)
+            return
 
-    @property
-    def size(self) -> int:
-        return max(self.x_size, self.y_size)
-
-    def generate(self):
-        '''Генерация поля с шашками и задаёт количество всего'''
-        self.checkers = [[Checker() for x in range(self.x_size)] for y in range(self.y_size)]
-        for y in range(self.y_size):
-            for x in range(self.x_size):
-                if (y + x) % 2:
-                    if (y < 5):
-                        self.checkers[y][x].change_type(CheckerType.BLACK_REGULAR)
-                    elif (y >= self.y_size - 5):
-                        self.checkers[y][x].change_type(CheckerType.WHITE_REGULAR)
-
-    def type_at(self, x: int, y: int) -> CheckerType:
-        '''Получение типа шашки на поле по координатам'''
-        return self.checkers[y][x].type
-
-    def at(self, x: int, y: int) -> Checker:
-        '''Получение шашки на поле по координатам'''
-        return self.checkers[y][x]
-
-    def is_within(self, x: int, y: int) -> bool:
-        '''Определяет лежит ли точка в пределах поля'''
-        return (0 <= x < self.x_size and 0 <= y < self.y_size)
+        self.after_id = None
+        self.current = None
+        self.canvas.delete(item)
+        if on_done is not None:
+            on_done()
+        self._start_next()
 
-    @property
-    def white_checkers_count(self) -> int:
-        '''Количество белых шашек на поле'''
-        count = 0
-        for row in self.checkers:
-            for checker in row:
-                if checker.type in WHITE_CHECKERS:
-                    count += 1
-        return count
 
-    @property
-    def black_checkers_count(self) -> int:
-        '''Количество чёрных шашек на поле'''
-        count = 0
-        for row in self.checkers:
-            for checker in row:
-                if checker.type in BLACK_CHECKERS:
-                    count += 1
-        return count
+# Партии пишутся в журнал одним фоновым потоком (по порядку), чтобы fsync не задерживал окно
+record_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gamelog')
 
-    @property
-    def white_score(self) -> int:
-        '''Счёт белых'''
-        score = 0
-        for row in self.checkers:
-            for checker in row:
-                if checker.type == CheckerType.WHITE_REGULAR:
-                    score += 1
-                elif checker.type == CheckerType.WHITE_QUEEN:
-                    score += 3
-        return score
 
-    @property
-    def black_score(self) -> int:
-        '''Счёт чёрных'''
-        score = 0
-        for row in self.checkers:
-            for checker in row:
-                if checker.type == CheckerType.BLACK_REGULAR:
-                    score += 1
-                elif checker.type == CheckerType.BLACK_QUEEN:
-                    score += 3
-        return score
+def write_record(record):
+    '''Запись партии в журнал по умолчанию (выполняется в record_executor)'''
+    try:
+        log = get_game_log()
+        log.append(record)
+        log.flush()
+    except OSError as error:
+        print(f'Партия не записана в журнал: {error}', file=sys.stderr)
 
 
 # Определение игры
-class Game:
-    def __init__(self, canvas: tk.Canvas, x_field_size: int, y_field_size: int):
+class Game(GameState):
+    def __init__(self, canvas: tk.Canvas, x_field_size: int, y_field_size: int, computer_side: SideType = None):
+        super().__init__(x_field_size, y_field_size)
         self.canvas = canvas
-        self.field = Field(x_field_size, y_field_size)
-
-        self.current_player = SideType.WHITE
 
         self.hovered_cell = Point()
         self.selected_cell = Point()
-        self.animated_cell = Point()
-
-        self.is_animating = False
-
-        self.white_points = 0
-        self.black_points = 0
+        # Клетки, шашки на которых скрыты, пока к ним летит их изображение
+        self.animated_cells = []
+        self.animator = MoveAnimator(canvas)
+
+        # Компьютерный противник думает в фоновом потоке; поток и таблица транспозиций
+        # создаются только для игры с компьютером и сохраняются при перезапуске игры на том же объекте
+        self.computer_side = computer_side
+        self.engine_worker = getattr(self, 'engine_worker', None)
+        if self.engine_worker is not None:
+            self.engine_worker.cancel()
+        elif computer_side is not None:
+            self.engine_worker = EngineWorker(Engine())
+        self.last_search = None
+
+        # Партия записывается в журнал один раз: по окончании, при сдаче или при закрытии
+        self.recorded = False
+
+        # Постоянные элементы холста создаются при первой отрисовке
+        self.cell_items = None
+        self.drawn_cell_size = None
+
+        # Кэш изображений сохраняется при перезапуске игры на том же холсте
+        if getattr(self, 'sprites', None) is None or self.sprites.master is not canvas:
+            self.sprites = SpriteCache(canvas)
+        self.images = None
+
+        # Ходы текущего игрока (клетка шашки -> клетки, куда она может пойти) строятся один раз
+        # в начале хода; номер версии индекса нужен, чтобы не перерисовывать подсказки без надобности
+        self.moves_index = {}
+        self.moves_captures = False
+        self.moves_index_version = 0
+        self.update_moves_index()
+        self.drawn_hint_key = None
+        self.drawn_movable_key = None
 
         self.init_images()
+        self.schedule_computer_turn()
 
     def init_images(self):
-        '''Инициализация изображений'''
-        self.images = {
-            CheckerType.WHITE_REGULAR: ImageTk.PhotoImage(
-                Image.open(Path('assets', 'white-regular.png')).resize((CELL_SIZE, CELL_SIZE), Image.LANCZOS)),
-            CheckerType.BLACK_REGULAR: ImageTk.PhotoImage(
-                Image.open(Path('assets', 'black-regular.png')).resize((CELL_SIZE, CELL_SIZE), Image.LANCZOS)),
-            CheckerType.WHITE_QUEEN: ImageTk.PhotoImage(
-                Image.open(Path('assets', 'white-queen.png')).resize((CELL_SIZE, CELL_SIZE), Image.LANCZOS)),
-            CheckerType.BLACK_QUEEN: ImageTk.PhotoImage(
-                Image.open(Path('assets', 'black-queen.png')).resize((CELL_SIZE, CELL_SIZE), Image.LANCZOS)),
-        }
-
-    def animate_move(self, move: Move):
-        '''Анимация перемещения шашки'''
-        self.is_animating = True  # Устанавливаем флаг анимаци
-        self.animated_cell = Point(move.from_x, move.from_y)
-        self.draw()
-
-        # Создание шашки для анимации
-        animated_checker = self.canvas.create_image(move.from_x * CELL_SIZE, move.from_y * CELL_SIZE,
-                                                      image=self.images.get(
-                                                          self.field.type_at(move.from_x, move.from_y)), anchor='nw',
-                                                      tag='animated_checker')
+        '''Инициализация изображений под текущий размер клетки'''
+        images = self.sprites.get(CELL_SIZE)
+        if images is not self.images:
+            self.images = images
+            # Шашки на холсте нужно перерисовать с новыми изображениями
+            self.drawn_cell_size = None
 
-        # Вектора движения
-        dx = 1 if move.from_x < move.to_x else -1
-        dy = 1 if move.from_y < move.to_y else -1
+    @property
+    def is_animating(self) -> bool:
+        return self.animator.is_running
 
-        # Анимация
-        for distance in range(abs(move.from_x - move.to_x)):
-            for _ in range(100 // ANIMATION_SPEED):
-                self.canvas.move(animated_checker, ANIMATION_SPEED / 100 * CELL_SIZE * dx,
-                                   ANIMATION_SPEED / 100 * CELL_SIZE * dy)
-                self.canvas.update()
-                sleep(0.01)
+    def animate_move(self, move: Move, checker_type: CheckerType):
+        '''Анимация перемещения шашки: шашка на конечной клетке скрыта до окончания анимации'''
+        self.animated_cells.append((move.to_x, move.to_y))
+        self.animator.animate(self.images.get(checker_type), move, lambda: self.finish_animation(move))
 
-        self.animated_cell = Point()
-        self.is_animating = False
+    def finish_animation(self, move: Move):
+        '''Окончание анимации: шашка снова показывается на своей клетке'''
+        self.animated_cells.remove((move.to_x, move.to_y))
+        self.draw()
 
     def draw(self):
-        '''Отрисовка сетки поля и шашек'''
-        self.canvas.delete('all')
+        '''Отрисовка сетки поля и шашек: обновляются только изменившиеся элементы холста'''
+        if self.cell_items is None:
+            self.create_canvas_items()
+        if self.drawn_cell_size != CELL_SIZE:
+            self.place_canvas_items()
         self.draw_field_grid()
         self.draw_checkers()
+        self.draw_movable_checkers()
+        self.draw_possible_moves()
 
-    def draw_field_grid(self):
-        '''Отрисовка сетки поля'''
+    def create_canvas_items(self):
+        '''Создание постоянных элементов холста: клеток, рамок и шашек'''
+        self.canvas.delete('all')
+
+        self.cell_items = [[self.canvas.create_rectangle(0, 0, 0, 0, fill=FIELD_COLORS[(y + x) % 2], width=0,
+                                                         tag='boards')
+                            for x in range(self.field.x_size)] for y in range(self.field.y_size)]
+
+        self.select_border = self.canvas.create_rectangle(0, 0, 0, 0, outline=SELECT_BORDER_COLOR,
+                                                          width=BORDER_WIDTH, state='hidden', tag='border')
+        self.hover_border = self.canvas.create_rectangle(0, 0, 0, 0, outline=HOVER_BORDER_COLOR,
+                                                         width=BORDER_WIDTH, state='hidden', tag='border')
+        self.border_cells = {self.select_border: None, self.hover_border: None}
+
+        # Отметки возможных ходов и шашек, которыми можно ходить, создаются по мере надобности
+        self.move_circles = []
+        self.shown_circles = 0
+        self.movable_borders = []
+        self.shown_movable_borders = 0
+
+        self.checker_items = [[self.canvas.create_image(0, 0, anchor='nw', state='hidden', tag='checkers')
+                               for x in range(self.field.x_size)] for y in range(self.field.y_size)]
+        self.drawn_types = [[CheckerType.NONE] * self.field.x_size for _ in range(self.field.y_size)]
+
+    def place_canvas_items(self):
+        '''Расстановка элементов холста под текущий размер клетки'''
         for y in range(self.field.y_size):
             for x in range(self.field.x_size):
-                self.canvas.create_rectangle(x * CELL_SIZE, y * CELL_SIZE, x * CELL_SIZE + CELL_SIZE,
-                                               y * CELL_SIZE + CELL_SIZE, fill=FIELD_COLORS[(y + x) % 2], width=0,
-                                               tag='boards')
-
-                # Отрисовка рамок у необходимых клеток
-                if (x == self.selected_cell.x and y == self.selected_cell.y):
-                    self.canvas.create_rectangle(x * CELL_SIZE + BORDER_WIDTH // 2, y * CELL_SIZE + BORDER_WIDTH // 2,
-                                                   x * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2,
-                                                   y * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2,
-                                                   outline=SELECT_BORDER_COLOR, width=BORDER_WIDTH, tag='border')
-                elif (x == self.hovered_cell.x and y == self.hovered_cell.y):
-                    self.canvas.create_rectangle(x * CELL_SIZE + BORDER_WIDTH // 2, y * CELL_SIZE + BORDER_WIDTH // 2,
-                                                   x * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2,
-                                                   y * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2,
-                                                   outline=HOVER_BORDER_COLOR, width=BORDER_WIDTH, tag='border')
-
-                # Отрисовка возможных точек перемещения, если есть выбранная ячейка
-                if (self.selected_cell):
-                    self.draw_possible_moves()
+                self.canvas.coords(self.cell_items[y][x], x * CELL_SIZE, y * CELL_SIZE,
+                                   x * CELL_SIZE + CELL_SIZE, y * CELL_SIZE + CELL_SIZE)
+                self.canvas.coords(self.checker_items[y][x], x * CELL_SIZE, y * CELL_SIZE)
+                # Изображения шашек могли смениться - обновим все
+                self.drawn_types[y][x] = None
+
+        self.border_cells = dict.fromkeys(self.border_cells)
+        self.drawn_hint_key = None
+        self.drawn_movable_key = None
+        self.drawn_cell_size = CELL_SIZE
+
+    def draw_field_grid(self):
+        '''Отрисовка рамок у выбранной клетки и клетки под курсором'''
+        self.place_border(self.select_border, self.selected_cell)
+        if self.hovered_cell == self.selected_cell:
+            self.place_border(self.hover_border, Point())
+        else:
+            self.place_border(self.hover_border, self.hovered_cell)
+
+    def place_border(self, item: int, cell: Point):
+        '''Перемещение рамки на клетку или её скрытие, если клетка вне поля'''
+        position = (cell.x, cell.y) if self.field.is_within(cell.x, cell.y) else None
+        if self.border_cells[item] == position:
+            return
+        self.border_cells[item] = position
+
+        if position is None:
+            self.canvas.itemconfig(item, state='hidden')
+            return
+        x, y = position
+        self.canvas.coords(item, x * CELL_SIZE + BORDER_WIDTH // 2, y * CELL_SIZE + BORDER_WIDTH // 2,
+                           x * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2,
+                           y * CELL_SIZE + CELL_SIZE - BORDER_WIDTH // 2)
+        self.canvas.itemconfig(item, state='normal')
+
+    def update_moves_index(self):
+        '''Построение индекса ходов текущего игрока в начале хода'''
+        self.moves_index, self.moves_captures = self.get_moves_index()
+        self.moves_index_version += 1
+
+    def draw_movable_checkers(self):
+        '''Отметка шашек, которыми может ходить человек'''
+        is_human_turn = self.current_player != self.computer_side
+        key = (self.moves_index_version, is_human_turn)
+        if self.drawn_movable_key == key:
+            return
+        self.drawn_movable_key = key
+        cells = list(self.moves_index) if is_human_turn else []
+
+        # Недостающие рамки добавляются под шашки
+        while len(self.movable_borders) < len(cells):
+            item = self.canvas.create_rectangle(0, 0, 0, 0, outline=MOVABLE_BORDER_COLOR, width=BORDER_WIDTH // 2,
+                                                state='hidden', tag='movable_border')
+            self.canvas.tag_lower(item, 'checkers')
+            self.movable_borders.append(item)
+
+        for item, (x, y) in zip(self.movable_borders, cells):
+            self.canvas.coords(item, x * CELL_SIZE + BORDER_WIDTH, y * CELL_SIZE + BORDER_WIDTH,
+                               x * CELL_SIZE + CELL_SIZE - BORDER_WIDTH, y * CELL_SIZE + CELL_SIZE - BORDER_WIDTH)
+            self.canvas.itemconfig(item, state='normal')
+        for item in self.movable_borders[len(cells):self.shown_movable_borders]:
+            self.canvas.itemconfig(item, state='hidden')
+        self.shown_movable_borders = len(cells)
 
     def draw_possible_moves(self):
-        self.canvas.delete('posible_move_circle')
-
-        # Получаем возможные ходы для текущего игрока
-        player_moves_list = self.get_moves_list(self.current_player)
-
-        # Отрисовываем возможные ходы для текущего игрока
-        for move in player_moves_list:
-            if (self.selected_cell.x == move.from_x and self.selected_cell.y == move.from_y):
-                self.canvas.create_oval(move.to_x * CELL_SIZE + CELL_SIZE / 3,
-                                          move.to_y * CELL_SIZE + CELL_SIZE / 3,
-                                          move.to_x * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3),
-                                          move.to_y * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3),
-                                          fill=POSIBLE_MOVE_CIRCLE_COLOR, width=0,
-                                          tag='posible_move_circle')
-
-        # Получаем возможные ходы для противника
-        opponent_moves_list = self.get_moves_list(SideType.opposite(self.current_player))
-
-        # Отрисовываем возможные ходы для противника
-        for move in opponent_moves_list:
-            if (self.selected_cell.x == move.from_x and self.selected_cell.y == move.from_y):
-                self.canvas.create_oval(move.to_x * CELL_SIZE + CELL_SIZE / 3,
-                                          move.to_y * CELL_SIZE + CELL_SIZE / 3,
-                                          move.to_x * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3),
-                                          move.to_y * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3),
-                                          fill=POSIBLE_MOVE_CIRCLE_COLOR, width=0,
-                                          tag='posible_move_circle')
+        '''Отрисовка возможных точек перемещения выбранной шашки'''
+        key = (self.moves_index_version, self.selected_cell.x, self.selected_cell.y)
+        if self.drawn_hint_key == key:
+            return
+        self.drawn_hint_key = key
+        targets = list(self.moves_index.get((self.selected_cell.x, self.selected_cell.y), ()))
+
+        # Недостающие отметки добавляются под шашки
+        while len(self.move_circles) < len(targets):
+            item = self.canvas.create_oval(0, 0, 0, 0, fill=POSIBLE_MOVE_CIRCLE_COLOR, width=0, state='hidden',
+                                           tag='posible_move_circle')
+            self.canvas.tag_lower(item, 'checkers')
+            self.move_circles.append(item)
+
+        for item, (x, y) in zip(self.move_circles, targets):
+            self.canvas.coords(item, x * CELL_SIZE + CELL_SIZE / 3, y * CELL_SIZE + CELL_SIZE / 3,
+                               x * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3), y * CELL_SIZE + (CELL_SIZE - CELL_SIZE / 3))
+            self.canvas.itemconfig(item, state='normal')
+        for item in self.move_circles[len(targets):self.shown_circles]:
+            self.canvas.itemconfig(item, state='hidden')
+        self.shown_circles = len(targets)
+
     def draw_checkers(self):
-        '''Отрисовка шашек'''
+        '''Отрисовка шашек, изменившихся с прошлой отрисовки'''
         for y in range(self.field.y_size):
             for x in range(self.field.x_size):
-                # Не отрисовывать пустые ячейки и анимируемую шашку
-                if (self.field.type_at(x, y) != CheckerType.NONE and not (
-                        x == self.animated_cell.x and y == self.animated_cell.y)):
-                    self.canvas.create_image(x * CELL_SIZE, y * CELL_SIZE,
-                                               image=self.images.get(self.field.type_at(x, y)), anchor='nw',
-                                               tag='checkers')
+                # Не отрисовывать анимируемую шашку
+                if self.animated_cells and (x, y) in self.animated_cells:
+                    checker_type = CheckerType.NONE
+                else:
+                    checker_type = self.field.type_at(x, y)
+
+                if checker_type == self.drawn_types[y][x]:
+                    continue
+                self.drawn_types[y][x] = checker_type
+
+                if checker_type == CheckerType.NONE:
+                    self.canvas.itemconfig(self.checker_items[y][x], state='hidden')
+                else:
+                    self.canvas.itemconfig(self.checker_items[y][x], image=self.images.get(checker_type),
+                                           state='normal')
 
     def mouse_move(self, event: tk.Event):
         '''Событие перемещения мышки'''
@@ -348,14 +379,16 @@ class Game:
         if (x != self.hovered_cell.x or y != self.hovered_cell.y):
             self.hovered_cell = Point(x, y)
 
-        self.draw()
+            # Меняются только рамки клеток
+            if self.cell_items is not None and self.drawn_cell_size == CELL_SIZE:
+                self.draw_field_grid()
 
     def mouse_down(self, event: tk.Event):
         '''Событие нажатия мышки'''
         x, y = (event.x) // CELL_SIZE, (event.y) // CELL_SIZE
 
-        # Если точка не внутри поля или идет анимация
-        if not self.field.is_within(x, y) or self.is_animating:
+        # Если точка не внутри поля, идет анимация или ходит компьютер
+        if not self.field.is_within(x, y) or self.is_animating or self.current_player == self.computer_side:
             return
 
         # Определяем, какие шашки у текущего игрока
@@ -364,332 +397,137 @@ class Game:
         else:
             player_checkers = BLACK_CHECKERS
 
-        # Получаем список всех обязательных ходов
-        all_required_moves = []
-        for check_y in range(self.field.y_size):
-            for check_x in range(self.field.x_size):
-                if self.field.type_at(check_x, check_y) in player_checkers:
-                    moves = self.get_required_moves_list_for_checker(self.current_player, check_x, check_y)
-                    all_required_moves.extend(moves)
+        # Ходы выбранной шашки по индексу, построенному в начале хода
+        targets = self.moves_index.get((self.selected_cell.x, self.selected_cell.y))
 
         # Если есть обязательные ходы
-        if all_required_moves:
-            # Если уже есть выбранная шашка с обязательным ходом
-            if self.selected_cell.x != -1:
-                required_moves = self.get_required_moves_list_for_checker(
-                    self.current_player, 
-                    self.selected_cell.x, 
-                    self.selected_cell.y
-                )
-                if required_moves:
-                    # Можно ходить только этой шашкой
-                    if x == self.selected_cell.x and y == self.selected_cell.y:
-                        return
-                    move = Move(self.selected_cell.x, self.selected_cell.y, x, y)
-                    if move in required_moves:
-                        self.handle_player_turn(move, x, y)
-                    return
-            
+        if self.moves_captures:
+            # Если уже есть выбранная шашка с обязательным ходом, можно ходить только этой шашкой
+            if targets:
+                if (x, y) in targets:
+                    self.handle_player_turn(Move(self.selected_cell.x, self.selected_cell.y, x, y), x, y)
+                return
+
             # Если выбирается новая шашка
-            if self.field.type_at(x, y) in player_checkers:
-                moves = self.get_required_moves_list_for_checker(self.current_player, x, y)
-                if moves:
-                    self.selected_cell = Point(x, y)
-                    self.draw()
+            if (x, y) in self.moves_index:
+                self.selected_cell = Point(x, y)
+                self.draw()
             return
 
         # Если нет обязательных ходов
         if self.field.type_at(x, y) in player_checkers:
             self.selected_cell = Point(x, y)
             self.draw()
-        elif self.selected_cell.x != -1:
-            move = Move(self.selected_cell.x, self.selected_cell.y, x, y)
-            if move in self.get_moves_list(self.current_player):
-                self.handle_player_turn(move, x, y)
+        elif targets and (x, y) in targets:
+            self.handle_player_turn(Move(self.selected_cell.x, self.selected_cell.y, x, y), x, y)
 
     def handle_move(self, move: Move, draw: bool = True) -> bool:
         '''Совершение хода'''
-        if draw:
-            self.animate_move(move)
-
-        # Изменение позиции шашки
-        self.field.at(move.to_x, move.to_y).change_type(self.field.type_at(move.from_x, move.from_y))
-        self.field.at(move.from_x, move.from_y).change_type(CheckerType.NONE)
-
-        # Вектора движения
-        dx = -1 if move.from_x < move.to_x else 1
-        dy = -1 if move.from_y < move.to_y else 1
-
-        # Удаление съеденных шашек
-        has_killed_checker = False
-        x, y = move.to_x, move.to_y
-        while x != move.from_x or y != move.from_y:
-            x += dx
-            y += dy
-            if self.field.type_at(x, y) != CheckerType.NONE:
-                # Подсчет очков в зависимости от типа съеденной шашки
-                checker_type = self.field.type_at(x, y)
-                if self.current_player == SideType.WHITE:
-                    if checker_type == CheckerType.BLACK_REGULAR:
-                        self.white_points += 1
-                    elif checker_type == CheckerType.BLACK_QUEEN:
-                        self.white_points += 3
-                else:
-                    if checker_type == CheckerType.WHITE_REGULAR:
-                        self.black_points += 1
-                    elif checker_type == CheckerType.WHITE_QUEEN:
-                        self.black_points += 3
-                self.field.at(x, y).change_type(CheckerType.NONE)
-                has_killed_checker = True
+        checker_type = self.field.type_at(move.from_x, move.from_y)
+        has_killed_checker = super().handle_move(move)
 
         if draw:
+            self.animate_move(move, checker_type)
             self.draw()
         return has_killed_checker
 
     def handle_player_turn(self, move: Move, x, y):
         '''Обработка хода игрока'''
-
-        # Была ли убита шашка
-        has_killed_checker = self.handle_move(move)
-
-        # Проверяем достижение последней линии
-        reached_end = (self.current_player == SideType.WHITE and y == 0) or \
-                     (self.current_player == SideType.BLACK and y == self.field.y_size - 1)
-
-        # Проверяем, есть ли обязательные ходы для текущей шашки
-        required_moves_list = self.get_required_moves_list_for_checker(self.current_player, x, y)
-
-        # Если есть обязательные ходы или достигнут край с возможностью взятия
-        if (has_killed_checker and required_moves_list) or (reached_end and required_moves_list):
+        if self.play_move(move):
             # Игрок должен продолжать ходить той же шашкой
+            self.update_moves_index()
             self.selected_cell = Point(x, y)  # Оставить выбранной текущую ячейку
             self.draw()  # Перерисовать поле
         else:
-            # Если нет обязательных ходов, проверяем на превращение в дамку
-            if self.current_player == SideType.WHITE and y == 0 and self.field.type_at(x, y) == CheckerType.WHITE_REGULAR:
-                self.field.at(x, y).change_type(CheckerType.WHITE_QUEEN)
-            elif self.current_player == SideType.BLACK and y == self.field.y_size - 1 and self.field.type_at(x, y) == CheckerType.BLACK_REGULAR:
-                self.field.at(x, y).change_type(CheckerType.BLACK_QUEEN)
-            
-            # Переключаем игрока
-            self.current_player = SideType.opposite(self.current_player)  # Переключить игрока
+            self.update_moves_index()
             self.selected_cell = Point()  # Сбросить выбранную ячейку
             self.draw()  # Перерисовать поле
-            self.check_for_game_over()
-
-    def get_required_moves_list_for_checker(self, side: SideType, x: int, y: int) -> list[Move]:
-        '''Получение списка обязательных ходов для конкретной шашки'''
-        moves_list = []
-
-        # Определение типов шашек
-        if side == SideType.WHITE:
-            friendly_checkers = WHITE_CHECKERS
-            enemy_checkers = BLACK_CHECKERS
-        elif side == SideType.BLACK:
-            friendly_checkers = BLACK_CHECKERS
-            enemy_checkers = WHITE_CHECKERS
-        else:
-            return moves_list
-
-        # Для обычной шашки
-        if self.field.type_at(x, y) == friendly_checkers[0]:
-            for offset in MOVE_OFFSETS:
-                if not self.field.is_within(x + offset.x * 2, y + offset.y * 2):
-                    continue
-
-                if self.field.type_at(x + offset.x, y + offset.y) in enemy_checkers and self.field.type_at(
-                        x + offset.x * 2, y + offset.y * 2) == CheckerType.NONE:
-                    moves_list.append(Move(x, y, x + offset.x * 2, y + offset.y * 2))
-
-        # Для дамки
-        elif self.field.type_at(x, y) == friendly_checkers[1]:
-            for offset in MOVE_OFFSETS:
-                if not self.field.is_within(x + offset.x * 2, y + offset.y * 2):
-                    continue
+            if not self.check_for_game_over():
+                self.schedule_computer_turn()
 
-                has_enemy_checker_on_way = False
-
-                for shift in range(1, self.field.size):
-                    if not self.field.is_within(x + offset.x * shift, y + offset.y * shift):
-                        continue
+    def schedule_computer_turn(self):
+        '''Передача хода компьютеру, если сейчас его очередь; иначе обдумывание на время хода игрока'''
+        if self.computer_side is None:
+            return
+        if self.current_player == self.computer_side:
+            self.engine_worker.search(self.field.board, self.current_player)
+            self.canvas.after(ENGINE_POLL_DELAY, self.computer_turn)
+        else:
+            self.engine_worker.ponder(self.field.board, self.current_player)
 
-                    # Если на пути не было вражеской шашки
-                    if not has_enemy_checker_on_way:
-                        if self.field.type_at(x + offset.x * shift, y + offset.y * shift) in enemy_checkers:
-                            has_enemy_checker_on_way = True
-                            continue
-                        # Если на пути союзная шашка - то закончить цикл
-                        elif self.field.type_at(x + offset.x * shift, y + offset.y * shift) in friendly_checkers:
-                            break
+    def computer_turn(self):
+        '''Ход компьютера, как только фоновый поиск закончен'''
+        if self.current_player != self.computer_side:
+            return
 
-                    # Если на пути была вражеская шашка
-                    if has_enemy_checker_on_way:
-                        if self.field.type_at(x + offset.x * shift, y + offset.y * shift) == CheckerType.NONE:
-                            moves_list.append(Move(x, y, x + offset.x * shift, y + offset.y * shift))
-                        else:
-                            break
+        result = self.engine_worker.poll()
+        if result is None:
+            self.canvas.after(ENGINE_POLL_DELAY, self.computer_turn)
+            return
 
-        return moves_list
+        self.last_search = result
+        for move in result.moves:
+            self.handle_player_turn(move, move.to_x, move.to_y)
 
-    def check_for_game_over(self):
+    def save_record(self, winner: SideType = None):
+        '''Запись партии в журнал (winner - None, если партия не окончена)'''
+        if self.recorded or not self.history:
+            return
+        self.recorded = True
+        # Запись собирается сразу: партия может быть начата заново, пока журнал пишется
+        record_executor.submit(write_record, record_from_game(self, winner))
+
+    def close(self):
+        '''Запись партии, остановка анимации и фонового поиска'''
+        self.save_record()
+        self.animator.cancel()
+        if self.engine_worker is not None:
+            self.engine_worker.close()
+
+    def check_for_game_over(self) -> bool:
         '''Проверка на конец игры'''
         game_over = False
 
-        white_moves_list = self.get_moves_list(SideType.WHITE)
-        if not (white_moves_list):
+        if not self.field.board.has_moves(SideType.WHITE):
             # Белые проиграли
             answer = tk.messagebox.showinfo('Конец игры', 'Чёрные выиграли')
             game_over = True
+            self.save_record(SideType.BLACK)
 
-        black_moves_list = self.get_moves_list(SideType.BLACK)
-        if not (black_moves_list):
+        if not self.field.board.has_moves(SideType.BLACK):
             # Чёрные проиграли
             answer = tk.messagebox.showinfo('Конец игры', 'Белые выиграли')
             game_over = True
+            self.save_record(SideType.WHITE)
 
         if (game_over):
             # Новая игра
-            self.__init__(self.canvas, self.field.x_size, self.field.y_size)
-
-    def get_moves_list(self, side: SideType) -> list[Move]:
-        '''Получение списка ходов'''
-        moves_list = self.get_required_moves_list(side)
-        if not (moves_list):
-            moves_list = self.get_optional_moves_list(side)
-        return moves_list
-    
-    def get_required_moves_list(self, side) :
-        '''Получение списка обязательных ходов'''
-        moves_list = []
-
-        # Определение типов шашек
-        if (side == SideType.WHITE):
-            friendly_checkers = WHITE_CHECKERS
-            enemy_checkers = BLACK_CHECKERS
-        elif (side == SideType.BLACK):
-            friendly_checkers = BLACK_CHECKERS
-            enemy_checkers = WHITE_CHECKERS
-        else:
-            return moves_list
+            self.animator.cancel()
+            self.__init__(self.canvas, self.field.x_size, self.field.y_size, self.computer_side)
+            self.draw()
+        return game_over
 
-        for y in range(self.field.y_size):
-            for x in range(self.field.x_size):
+# Проверка и хеширование паролей идут в фоновом потоке, чтобы окно не замирало
+auth_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='auth')
 
-                # Для обычной шашки
-                if (self.field.type_at(x, y) == friendly_checkers[0]):
-                    for offset in MOVE_OFFSETS:
-                        if not (self.field.is_within(x + offset.x * 2, y + offset.y * 2)): continue
-
-                        if self.field.type_at(x + offset.x, y + offset.y) in enemy_checkers and self.field.type_at(
-                                x + offset.x * 2, y + offset.y * 2) == CheckerType.NONE:
-                            moves_list.append(Move(x, y, x + offset.x * 2, y + offset.y * 2))
-
-                # Для дамки
-                elif (self.field.type_at(x, y) == friendly_checkers[1]):
-                    for offset in MOVE_OFFSETS:
-                        if not (self.field.is_within(x + offset.x * 2, y + offset.y * 2)): continue
-
-                        has_enemy_checker_on_way = False
-
-                        for shift in range(1, self.field.size):
-                            if not (self.field.is_within(x + offset.x * shift, y + offset.y * shift)): continue
-
-                            # Если на пути не было вражеской шашки
-                            if (not has_enemy_checker_on_way):
-                                if (self.field.type_at(x + offset.x * shift, y + offset.y * shift) in enemy_checkers):
-                                    has_enemy_checker_on_way = True
-                                    continue
-                                # Если на пути союзная шашка - то закончить цикл
-                                elif (self.field.type_at(x + offset.x * shift,
-                                                           y + offset.y * shift) in friendly_checkers):
-                                    break
-
-                            # Если на пути была вражеская шашка
-                            if (has_enemy_checker_on_way):
-                                if (self.field.type_at(x + offset.x * shift,
-                                                         y + offset.y * shift) == CheckerType.NONE):
-                                    moves_list.append(Move(x, y, x + offset.x * shift, y + offset.y * shift))
-                                else:
-                                    break
-
-        return moves_list
-    def get_optional_moves_list(self, side: SideType) -> list[Move]:
-        '''Получение списка необязательных ходов'''
-        moves_list = []
-
-        # Определение типов шашек
-        if (side == SideType.WHITE):
-            friendly_checkers = WHITE_CHECKERS
-        elif (side == SideType.BLACK):
-            friendly_checkers = BLACK_CHECKERS
+
+def run_in_background(window: tk.Misc, function, args: tuple, on_done, on_error):
+    '''Вызов function(*args) в фоновом потоке; on_done(результат) или
+    on_error(исключение) вызывается в потоке Tk'''
+    future = auth_executor.submit(function, *args)
+
+    def poll():
+        if future.done():
+            try:
+                result = future.result()
+            except Exception as error:
+                on_error(error)
+            else:
+                on_done(result)
         else:
-            return moves_list
+            window.after(AUTH_POLL_DELAY, poll)
 
-        for y in range(self.field.y_size):
-            for x in range(self.field.x_size):
-                # Для обычной шашки
-                if (self.field.type_at(x, y) == friendly_checkers[0]):
-                    for offset in MOVE_OFFSETS[:2] if side == SideType.WHITE else MOVE_OFFSETS[2:]:
-                        if not (self.field.is_within(x + offset.x, y + offset.y)): continue
-
-                        if (self.field.type_at(x + offset.x, y + offset.y) == CheckerType.NONE):
-                            moves_list.append(Move(x, y, x + offset.x, y + offset.y))
-
-                # Для дамки
-                elif (self.field.type_at(x, y) == friendly_checkers[1]):
-                    for offset in MOVE_OFFSETS:
-                        if not (self.field.is_within(x + offset.x, y + offset.y)): continue
-
-                        for shift in range(1, self.field.size):
-                            if not (self.field.is_within(x + offset.x * shift, y + offset.y * shift)): continue
-
-                            if (self.field.type_at(x + offset.x * shift, y + offset.y * shift) == CheckerType.NONE):
-                                moves_list.append(Move(x, y, x + offset.x * shift, y + offset.y * shift))
-                            else:
-                                break
-        return moves_list
-
-def check_user(username: str, password: str) -> bool:
-    """Проверка существования пользователя"""
-    try:
-        with open('users.json', 'r') as file:
-            users = json.load(file)
-            
-        # Хешируем введенный пароль
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        
-        # Проверяем существование пользователя и правильность пароля
-        if username in users and users[username] == hashed_password:
-            return True
-        return False
-    except FileNotFoundError:
-        return False
-
-def register_user(username: str, password: str) -> bool:
-    """Регистрация нового пользователя"""
-    try:
-        # Пытаемся загрузить существующих пользователей
-        with open('users.json', 'r') as file:
-            users = json.load(file)
-    except FileNotFoundError:
-        # Если файл не существует, создаем пустой словарь
-        users = {}
-    
-    # Проверяем, не существует ли уже такой пользователь
-    if username in users:
-        return False
-    
-    # Хешируем пароль перед сохранением
-    hashed_password = hashlib.sha256(password.encode()).hexdigest()
-    
-    # Добавляем нового пользователя
-    users[username] = hashed_password
-    
-    # Сохраняем обновленный список пользователей
-    with open('users.json', 'w') as file:
-        json.dump(users, file)
-    
-    return True
+    window.after(AUTH_POLL_DELAY, poll)
 
 def auth_gui():
     window = tk.Tk()
@@ -814,12 +652,22 @@ def auth_gui():
             messagebox.showerror("Ошибка", "Заполните все поля")
             return
 
-        if check_user(username, password):
+        # Пока пароль проверяется, повторное нажатие не принимается
+        send_btn.config(state=tk.DISABLED)
+        run_in_background(window, check_user, (username, password), checked, check_failed)
+
+    def checked(success: bool):
+        if success:
             window.destroy()
             GameGui().draw_gui()
         else:
+            send_btn.config(state=tk.NORMAL)
             messagebox.showerror("Ошибка", "Неверное имя пользователя или пароль")
 
+    def check_failed(error: Exception):
+        send_btn.config(state=tk.NORMAL)
+        messagebox.showerror("Ошибка", f"Не удалось проверить пароль: {error}")
+
     def exit_program():
         window.destroy()
     
@@ -968,13 +816,23 @@ def reg_gui():
             messagebox.showerror("Ошибка", "Пароли не совпадают")
             return
 
-        if register_user(username, password):
+        # Пока пароль хешируется, повторное нажатие не принимается
+        reg_btn.config(state=tk.DISABLED)
+        run_in_background(window, register_user, (username, password), registered, register_failed)
+
+    def registered(success: bool):
+        if success:
             messagebox.showinfo("Успех", "Регистрация успешна!")
             window.destroy()
             auth_gui()
         else:
+            reg_btn.config(state=tk.NORMAL)
             messagebox.showerror("Ошибка", "Пользователь с таким именем уже существует")
 
+    def register_failed(error: Exception):
+        reg_btn.config(state=tk.NORMAL)
+        messagebox.showerror("Ошибка", f"Не удалось зарегистрироваться: {error}")
+
     def back_to_auth():
         window.destroy()
         auth_gui()
@@ -1008,7 +866,11 @@ class GameGui:
         # Передаем canvas вместо main_window
         self.game = Game(self.canvas, X_SIZE, Y_SIZE)
 
+        # Сторона компьютера (None - игра с человеком)
+        self.computer_side = None
+
     def exit_game(self):
+        self.game.close()
         self.main_window.destroy()
 
     def show_rules(self):
@@ -1151,6 +1013,14 @@ class GameGui:
         rules_window.protocol("WM_DELETE_WINDOW", on_closing)
         rules_window.bind('<Escape>', lambda e: on_closing())
     def start_game_man(self):
+        self.computer_side = None
+        self.new_game()
+    def start_game_computer(self):
+        """Игра с компьютером: компьютер играет за сторону, противоположную игроку"""
+        self.computer_side = SideType.opposite(PLAYER_SIDE)
+        self.new_game()
+    def new_game(self):
+        self.game.close()
         self.main_window.destroy()
         self.start_game()
     def surrender(self):
@@ -1165,12 +1035,13 @@ class GameGui:
         # Если игрок подтвердил сдачу
         if answer:
             winner = "Чёрные" if self.game.current_player == SideType.WHITE else "Белые"
+            self.game.save_record(SideType.opposite(self.game.current_player))
             messagebox.showinfo(
                 "Конец игры", 
                 f"{winner} выиграли!"
             )
             # Начинаем новую игру
-            self.start_game_man()
+            self.new_game()
     def start_game(self):
         # Создание окна игры
         self.main_window = tk.Tk()
@@ -1224,6 +1095,8 @@ class GameGui:
             
             # Вычисляем размер стороны квадратного canvas
             size = min(frame_width, frame_height) - 40  # Отступ по 20 пикселей с каждой стороны
+            if size < 12:
+                return
             
             # Обновляем размеры canvas
             main_canvas.config(width=size, height=size)
@@ -1234,11 +1107,20 @@ class GameGui:
             
             # Перерисовываем игровое поле
             if hasattr(self, 'game'):
-                self.game.init_images()  # Обновляем размеры изображений
+                self.game.init_images()  # Берём изображения из кэша
                 self.game.draw()  # Перерисовываем поле
 
+        # Серия событий изменения размера обрабатывается один раз, после паузы
+        resize_after_id = None
+
+        def schedule_resize(event=None):
+            nonlocal resize_after_id
+            if resize_after_id is not None:
+                self.main_window.after_cancel(resize_after_id)
+            resize_after_id = self.main_window.after(RESIZE_DELAY, resize_canvas)
+
         # Привязываем функцию к изменению размера фрейма
-        game_frame.bind('<Configure>', resize_canvas)
+        game_frame.bind('<Configure>', schedule_resize)
 
         # Очки в правой панели
         score_frame = tk.Frame(right_panel, bg='#34495e')
@@ -1259,6 +1141,11 @@ class GameGui:
         black_score = tk.Label(score_frame, textvariable=black_score_var, **score_style)
         black_score.pack(pady=5)
 
+        # Информация о последнем поиске компьютера
+        engine_info_var = tk.StringVar(value="")
+        engine_info = tk.Label(score_frame, textvariable=engine_info_var, wraplength=260, **score_style)
+        engine_info.pack(pady=5)
+
         # Кнопки в правой панели
         buttons_frame = tk.Frame(right_panel, bg='#34495e')
         buttons_frame.pack(pady=20)
@@ -1272,7 +1159,7 @@ class GameGui:
 
         new_game_btn = tk.Button(buttons_frame, 
                                 text="Новая игра", 
-                                command=lambda: self.start_game_man(),
+                                command=lambda: self.new_game(),
                                 bg="#27ae60",
                                 fg="white",
                                 activebackground="#219a52",
@@ -1298,13 +1185,17 @@ class GameGui:
         exit_btn.pack(pady=5)
 
         # Создаем новую игру с новым canvas
-        self.game = Game(main_canvas, X_SIZE, Y_SIZE)
+        self.game = Game(main_canvas, X_SIZE, Y_SIZE, self.computer_side)
+        # Закрытие окна средствами системы записывает партию, как и кнопка выхода
+        self.main_window.protocol("WM_DELETE_WINDOW", self.exit_game)
 
         # Обновление информации об игре
         def update_game_info():
             current_turn_var.set(f"Ход: {'Белые' if self.game.current_player == SideType.WHITE else 'Черные'}")
             white_score_var.set(f"Очки белых: {self.game.white_points}")
             black_score_var.set(f"Очки черных: {self.game.black_points}")
+            if self.game.last_search is not None:
+                engine_info_var.set(f"Компьютер: {self.game.last_search}")
             self.main_window.after(100, update_game_info)
 
         # Привязка событий
@@ -1374,6 +1265,17 @@ class GameGui:
                             **button_style)
         play_button.pack(pady=10)
 
+        # Кнопка "Игра с компьютером"
+        computer_button = tk.Button(button_frame,
+                            text="Игра с компьютером",
+                            command=self.start_game_computer,
+                            bg='#16a085',  # Бирюзовый
+                            fg='white',
+                            activebackground='#138d75',
+                            activeforeground='white',
+                            **button_style)
+        computer_button.pack(pady=10)
+
         # Кнопка "Правила"
         rules_button = tk.Button(button_frame,
                                 text="Правила",
@@ -1395,6 +1297,3 @@ class GameGui:
                             activeforeground='white',
                             **button_style)
         exit_button.pack(pady=10)
-
-# Запуск интерфейса авторизации
-auth_gui()
\ No newline at end of file
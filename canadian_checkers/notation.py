@@ -0,0 +1,222 @@
+'''Запись позиции: текст в стиле FEN и двоичная запись постоянной длины
+
+Текст - очередь хода и списки клеток белых и чёрных шашек через двоеточие, как
+в FEN формата PDN: W:W61,62,K5:B1,2. Тёмные клетки нумеруются с единицы
+построчно сверху вниз и слева направо (на поле 12x12 - от 1 до 72), K перед
+номером обозначает дамку. При чтении вместо нескольких клеток подряд можно
+указать диапазон: B1-30.
+
+Двоичная запись постоянной длины - байт очереди хода (0 - белые, 1 - чёрные)
+и три маски тёмных клеток little-endian: занятые клетки, клетки чёрных шашек и
+клетки дамок. Бит номер n маски - клетка с номером n + 1; на поле 12x12 маска
+занимает 9 байт, а запись - 28 байт. У каждой клетки в записи постоянное
+место, поэтому пачку позиций - записи подряд без разделителей - можно
+разбирать целиком: позиция номер i занимает байты с i * size по (i + 1) * size,
+её маска занятых клеток - байты с 1 по 1 + mask_size и т.д. Например, в numpy
+пачка - массив байт формы (n, size), а numpy.unpackbits(..., bitorder='little')
+по столбцам одной маски даёт эту маску для всех позиций сразу. Пачка
+передаётся между процессами одним куском bytes вместо сериализации объектов
+поля.
+
+Три маски - по 3 бита на клетку - длиннее самой плотной записи: у клетки пять
+состояний (пусто, белая, чёрная, белая или чёрная дамка), и запись числом по
+основанию 5 заняла бы 22 байта, а маска занятых клеток с парой битов на каждую
+шашку - до 25 байт. Но в них место шашки зависит от остальных шашек, и читать
+их можно только по одной записи с перебором битов; 28 байт - цена постоянного
+места каждой клетки. Сами encode_many и decode_many векторной обработки не
+дают: struct разбирает поля всех записей за один проход, но доска BitBoard
+строится для каждой записи отдельно.
+'''
+import struct
+
+from .core import SideType, BitBoard, BoardLayout, X_SIZE, Y_SIZE
+
+# Обозначения очереди хода и цвета шашек в тексте позиции
+FEN_SIDES = {'W': SideType.WHITE, 'B': SideType.BLACK}
+FEN_QUEEN = 'K'
+
+
+def _byte_tables(bits: list[int], size: int) -> list[list[int]]:
+    '''Таблицы по байтам маски: для байта номер k и его значения - сумма bits
+    битов маски, стоящих в этом байте (bits[n] - значение бита номер n маски)'''
+    bits = bits + [0] * (size * 8 - len(bits))
+    tables = []
+    for k in range(size):
+        table = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            table[value] = table[value ^ low] | bits[k * 8 + low.bit_length() - 1]
+        tables.append(table)
+    return tables
+
+
+# Определение записи позиций
+class PositionCodec:
+    '''Запись позиций на поле заданного размера (создаётся один раз на размер).
+
+    Маски доски содержат призрачные биты (см. BoardLayout), поэтому перед
+    записью они сжимаются в маски тёмных клеток, а при чтении разжимаются
+    обратно - по таблицам для каждого байта маски, без перебора битов.
+    '''
+
+    _cache = {}
+
+    def __init__(self, x_size: int, y_size: int):
+        self.layout = BoardLayout.get(x_size, y_size)
+        # Клетки по номерам (с нуля) и номера клеток по координатам
+        self.points = [(x, y) for y in range(y_size) for x in range(x_size) if (x + y) % 2]
+        self.numbers = {point: number for number, point in enumerate(self.points)}
+        self.count = len(self.points)
+        self.mask_size = (self.count + 7) // 8
+        self.size = 1 + 3 * self.mask_size
+        self.record = struct.Struct(f'<B{self.mask_size}s{self.mask_size}s{self.mask_size}s')
+
+        # Бит доски -> бит маски тёмных клеток и обратно
+        squares = [self.layout.squares[y][x] for x, y in self.points]
+        board_bits = [0] * len(self.layout.points)
+        for number, square in enumerate(squares):
+            board_bits[square] = 1 << number
+        self.board_size = (len(board_bits) + 7) // 8
+        self.compress_tables = _byte_tables(board_bits, self.board_size)
+        self.expand_tables = _byte_tables([1 << square for square in squares], self.mask_size)
+
+    @classmethod
+    def get(cls, x_size: int = X_SIZE, y_size: int = Y_SIZE) -> 'PositionCodec':
+        '''Запись позиций для поля заданного размера'''
+        codec = cls._cache.get((x_size, y_size))
+        if codec is None:
+            codec = cls._cache[(x_size, y_size)] = cls(x_size, y_size)
+        return codec
+
+    def compress(self, mask: int) -> int:
+        '''Маска доски -> маска тёмных клеток'''
+        return sum(map(list.__getitem__, self.compress_tables, mask.to_bytes(self.board_size, 'little')))
+
+    def expand(self, mask: int) -> int:
+        '''Маска тёмных клеток -> маска доски'''
+        return sum(map(list.__getitem__, self.expand_tables, mask.to_bytes(self.mask_size, 'little')))
+
+    def _check(self, board: BitBoard):
+        if board.layout is not self.layout:
+            raise ValueError(f'Позиция записывается для поля {self.layout.x_size}x{self.layout.y_size}')
+
+    def encode(self, board: BitBoard, side: SideType) -> bytes:
+        '''Двоичная запись позиции'''
+        self._check(board)
+        occupied = self.compress(board.white | board.black)
+        black = self.compress(board.black)
+        queens = self.compress(board.white_queen | board.black_queen)
+        bits = 8 * self.mask_size
+        value = (side == SideType.BLACK) | occupied << 8 | black << (8 + bits) | queens << (8 + 2 * bits)
+        return value.to_bytes(self.size, 'little')
+
+    def decode(self, data: bytes) -> tuple[BitBoard, SideType]:
+        '''Позиция и очередь хода по двоичной записи'''
+        if len(data) != self.size:
+            raise ValueError(f'Длина записи позиции должна быть {self.size} байт, а не {len(data)}')
+        return self._decode(*self.record.unpack(data))
+
+    def _decode(self, side: int, occupied: bytes, black: bytes, queens: bytes) -> tuple[BitBoard, SideType]:
+        occupied = int.from_bytes(occupied, 'little')
+        black = int.from_bytes(black, 'little')
+        queens = int.from_bytes(queens, 'little')
+        if side > 1 or occupied >> self.count or (black | queens) & ~occupied:
+            raise ValueError('Неверная запись позиции')
+        white = occupied ^ black
+        white_queen = white & queens
+        black_queen = black & queens
+        return BitBoard.from_masks(self.layout.x_size, self.layout.y_size, self.expand(white ^ white_queen),
+                                   self.expand(black ^ black_queen), self.expand(white_queen),
+                                   self.expand(black_queen)), SideType.BLACK if side else SideType.WHITE
+
+    def to_fen(self, board: BitBoard, side: SideType) -> str:
+        '''Текст позиции в стиле FEN'''
+        self._check(board)
+        queens = self.compress(board.white_queen | board.black_queen)
+        lists = []
+        for name, checkers in (('W', board.white), ('B', board.black)):
+            items = []
+            rest = self.compress(checkers)
+            while rest:
+                bit = rest & -rest
+                rest ^= bit
+                items.append(f'{FEN_QUEEN if queens & bit else ""}{bit.bit_length()}')
+            lists.append(name + ','.join(items))
+        return ':'.join(['W' if side == SideType.WHITE else 'B'] + lists)
+
+    def from_fen(self, text: str) -> tuple[BitBoard, SideType]:
+        '''Позиция и очередь хода по тексту в стиле FEN'''
+        parts = text.strip().split(':')
+        if parts[0].strip() not in FEN_SIDES:
+            raise ValueError(f'Неверная очередь хода в позиции: {text}')
+        side = FEN_SIDES[parts[0].strip()]
+
+        masks = [0, 0, 0, 0]
+        occupied = 0
+        for part in parts[1:]:
+            part = part.strip()
+            if not part or part[0] not in FEN_SIDES:
+                raise ValueError(f'Неверный список шашек в позиции: {part}')
+            black = part[0] == 'B'
+            for item in filter(None, (item.strip() for item in part[1:].split(','))):
+                queen = item.startswith(FEN_QUEEN)
+                first, _, last = item[queen:].partition('-')
+                try:
+                    numbers = range(int(first), int(last or first) + 1)
+                except ValueError:
+                    raise ValueError(f'Неверный номер клетки в позиции: {item}') from None
+                for number in numbers:
+                    if not 1 <= number <= self.count:
+                        raise ValueError(f'Нет клетки с номером {number}')
+                    bit = 1 << (number - 1)
+                    if occupied & bit:
+                        raise ValueError(f'Клетка {number} указана дважды')
+                    occupied |= bit
+                    masks[black + 2 * queen] |= bit
+        return BitBoard.from_masks(self.layout.x_size, self.layout.y_size, *map(self.expand, masks)), side
+
+    def encode_many(self, positions) -> bytes:
+        '''Пачка позиций (доска, очередь хода) одним куском bytes'''
+        return b''.join([self.encode(board, side) for board, side in positions])
+
+    def decode_many(self, data: bytes):
+        '''Генератор позиций из пачки'''
+        if len(data) % self.size:
+            raise ValueError(f'Длина пачки позиций не кратна {self.size} байтам')
+        # Поля всех записей разбираются одним проходом struct
+        for fields in self.record.iter_unpack(data):
+            yield self._decode(*fields)
+
+
+# Длина двоичной записи позиции на поле по умолчанию
+POSITION_SIZE = PositionCodec.get().size
+
+
+def position_to_fen(board: BitBoard, side: SideType) -> str:
+    '''Текст позиции в стиле FEN'''
+    return PositionCodec.get(board.layout.x_size, board.layout.y_size).to_fen(board, side)
+
+
+def position_from_fen(text: str, x_size: int = X_SIZE, y_size: int = Y_SIZE) -> tuple[BitBoard, SideType]:
+    '''Позиция и очередь хода по тексту в стиле FEN'''
+    return PositionCodec.get(x_size, y_size).from_fen(text)
+
+
+def encode_position(board: BitBoard, side: SideType) -> bytes:
+    '''Двоичная запись позиции'''
+    return PositionCodec.get(board.layout.x_size, board.layout.y_size).encode(board, side)
+
+
+def decode_position(data: bytes, x_size: int = X_SIZE, y_size: int = Y_SIZE) -> tuple[BitBoard, SideType]:
+    '''Позиция и очередь хода по двоичной записи'''
+    return PositionCodec.get(x_size, y_size).decode(data)
+
+
+def encode_positions(positions, x_size: int = X_SIZE, y_size: int = Y_SIZE) -> bytes:
+    '''Пачка позиций (доска, очередь хода) одним куском bytes'''
+    return PositionCodec.get(x_size, y_size).encode_many(positions)
+
+
+def decode_positions(data: bytes, x_size: int = X_SIZE, y_size: int = Y_SIZE):
+    '''Генератор позиций (доска, очередь хода) из пачки'''
+    return PositionCodec.get(x_size, y_size).decode_many(data)
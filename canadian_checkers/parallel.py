@@ -0,0 +1,158 @@
+'''Параллельный поиск: ходы из корня распределяются по процессам
+
+Позиция вместе с очередью хода передаётся процессам двоичной записью
+постоянной длины (notation.encode_position), а ход - кодом engine.turn_code:
+номер хода в упорядоченном списке главного процесса не совпадает с номером в
+BitBoard.turns исполнителя. Между процессами пересылается несколько десятков
+байт вместо объектов поля.
+'''
+import multiprocessing
+import os
+import queue
+from time import perf_counter
+
+from .core import SideType, BitBoard, Turn
+from .engine import (MAX_PREDICTION_DEPTH, ENGINE_TIME_LIMIT, ENGINE_SOFT_TIME_LIMIT, TT_SIZE_MB, WIN_SCORE,
+                     Engine, SearchResult, SearchTimeout, turn_code, find_turn)
+from .notation import encode_position, decode_position
+
+# Движок процесса-исполнителя со своей таблицей транспозиций
+_worker_engine = None
+
+
+def _init_worker(tt_size_mb: float):
+    '''Создание движка в процессе-исполнителе'''
+    global _worker_engine
+    _worker_engine = Engine(tt_size_mb=tt_size_mb)
+
+
+def _search_turn(task: tuple) -> tuple:
+    '''Оценка одного хода из корня в процессе-исполнителе'''
+    position, size, index, code, depth, alpha, time_left = task
+    board, side = decode_position(position, *size)
+    turn = find_turn(board.turns(side, unique=True), code)
+
+    engine = _worker_engine
+    engine.nodes = 0
+    engine.deadline = perf_counter() + time_left
+    engine.tt.new_search()
+    try:
+        score = engine.search_turn(board, side, turn, alpha, depth)
+    except SearchTimeout:
+        score = None
+    return index, alpha, score, engine.nodes, engine.tt.probes, engine.tt.hits, engine.tt.fill
+
+
+# Определение параллельного компьютерного противника
+class ParallelEngine(Engine):
+    '''Поиск с распределением ходов из корня по пулу процессов.
+
+    Глубина растёт итеративно, как в Engine, и на каждой итерации первый ход
+    (лучший ход прошлой итерации) считается в главном процессе с полным окном
+    и даёт нижнюю границу alpha, остальные ходы параллельно считаются исполнителями с окном
+    (alpha, WIN_SCORE). Задания выдаются по мере освобождения исполнителей,
+    и каждое новое задание получает лучшую на этот момент оценку, поэтому
+    отсечений почти столько же, сколько при последовательном поиске.
+    Процессы запускаются способом spawn и импортируют только модули без
+    графического интерфейса.
+    '''
+
+    def __init__(self, depth: int = MAX_PREDICTION_DEPTH, time_limit: float = ENGINE_TIME_LIMIT,
+                 tt_size_mb: float = TT_SIZE_MB, workers: int = None,
+                 soft_time_limit: float = ENGINE_SOFT_TIME_LIMIT):
+        super().__init__(depth, time_limit, tt_size_mb, soft_time_limit)
+        self.workers = workers or os.cpu_count() or 1
+        self.tt_size_mb = tt_size_mb
+        self.pool = None
+        self.fill = 0.0  # Наибольшее заполнение таблиц транспозиций главного процесса и исполнителей
+
+    def start(self):
+        '''Запуск пула процессов (при первом поиске запускается сам)'''
+        if self.pool is None:
+            context = multiprocessing.get_context('spawn')
+            self.pool = context.Pool(self.workers, _init_worker, (self.tt_size_mb,))
+
+    def close(self):
+        '''Остановка пула процессов'''
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, board: BitBoard, side: SideType, deadline: float = None,
+               soft_deadline: float = None) -> SearchResult:
+        '''Поиск с итеративным углублением, как в Engine.search; ходы из корня на каждой
+        итерации распределяются по процессам, а результат берётся из последней завершённой'''
+        self.start()
+        self.fill = 0.0
+        result = super().search(board, side, deadline, soft_deadline)
+        result.tt_fill = max(result.tt_fill, self.fill)
+        return result
+
+    def _search_root(self, board: BitBoard, side: SideType, turns: list[Turn], depth: int):
+        '''Поиск из корня с распределением ходов по процессам: лучший из полностью
+        просчитанных ходов, его оценка и признак, что просчитаны все ходы'''
+        turns = self._order_turns(board, side, turns, board.side_hash(side), 0)
+        best_turn = None
+        best_score = -WIN_SCORE
+        self.fill = self.tt.fill
+        if not turns:
+            return best_turn, best_score, True
+
+        try:
+            # Первый ход задаёт границу для остальных
+            best_score = self.search_turn(board, side, turns[0], -WIN_SCORE, depth)
+        except SearchTimeout:
+            return best_turn, best_score, False
+        best_turn = turns[0]
+        best_index = 0
+        self.fill = self.tt.fill
+
+        position = encode_position(board, side)
+        size = (board.layout.x_size, board.layout.y_size)
+        results = queue.SimpleQueue()
+        completed = True
+        next_index = 1
+        running = 0
+        while next_index < len(turns) or running:
+            while completed and next_index < len(turns) and running < self.workers:
+                task = (position, size, next_index, turn_code(turns[next_index]), depth, best_score,
+                        self.deadline - perf_counter())
+                self.pool.apply_async(_search_turn, (task,), callback=results.put, error_callback=results.put)
+                next_index += 1
+                running += 1
+            if not running:
+                break
+
+            result = results.get()
+            running -= 1
+            if isinstance(result, BaseException):
+                raise result
+            index, alpha, score, nodes, worker_probes, worker_hits, worker_fill = result
+            # Статистика исполнителей складывается со статистикой таблицы главного процесса
+            self.nodes += nodes
+            self.tt.probes += worker_probes
+            self.tt.hits += worker_hits
+            self.fill = max(self.fill, worker_fill)
+
+            # Ход, не досчитанный за отведённое время: новые задания не выдаются,
+            # а из досчитанных выбирается лучший
+            if score is None:
+                completed = False
+                continue
+            # Точная оценка известна только для ходов лучше alpha. При равных оценках, как и
+            # при последовательном поиске, выбирается ход, стоящий в списке раньше.
+            if score <= alpha:
+                continue
+            if score > best_score or (score == best_score and index < best_index):
+                best_score = score
+                best_index = index
+                best_turn = turns[index]
+        return best_turn, best_score, completed
@@ -0,0 +1,188 @@
+'''Подсчёт позиций (perft) для проверки генератора ходов
+
+Перебор идёт по ходам целиком (BitBoard.turns): после взятия, а также по
+достижении последней горизонтали шашка продолжает ход, как в
+GameState.play_move, и превращается в дамку только в конце хода. Каждая
+цепочка взятий считается отдельно, даже если итог у цепочек одинаков. Число
+позиций на каждой глубине сверяется с записанными эталонами, так что
+ускорение генератора проверяется сразу и по скорости, и по точности.
+'''
+from time import perf_counter
+
+from .core import SideType, CheckerType, BitBoard, X_SIZE, Y_SIZE
+
+# Обозначения клеток на диаграмме позиции
+DIAGRAM_CHECKERS = {
+    '-': CheckerType.NONE,
+    'w': CheckerType.WHITE_REGULAR,
+    'b': CheckerType.BLACK_REGULAR,
+    'W': CheckerType.WHITE_QUEEN,
+    'B': CheckerType.BLACK_QUEEN,
+}
+
+# Тестовые позиции: очередь хода и диаграмма поля (точка - светлая клетка,
+# минус - пустая тёмная клетка). Начальная расстановка задаётся без диаграммы.
+POSITIONS = {
+    'start': (SideType.WHITE, None),
+    # Середина партии, взятий нет
+    'midgame': (SideType.WHITE, '''
+        .b.b.b.b.b.b
+        b.b.b.b.b.b.
+        .-.b.b.b.b.b
+        -.-.b.-.-.-.
+        .-.-.b.-.-.-
+        -.b.-.b.-.-.
+        .-.-.-.-.w.-
+        -.w.-.-.w.-.
+        .-.w.w.-.w.-
+        w.w.-.w.w.w.
+        .w.w.w.w.w.w
+        w.-.w.w.w.w.
+    '''),
+    # Взятие четырёх шашек за ход, в том числе назад
+    'multijump': (SideType.BLACK, '''
+        .-.b.b.b.b.b
+        b.-.b.b.-.b.
+        .-.b.-.b.-.-
+        -.-.b.-.-.b.
+        .-.b.-.-.b.-
+        -.-.b.-.-.-.
+        .-.-.-.-.b.-
+        w.w.-.-.w.-.
+        .-.-.w.-.-.-
+        w.w.w.w.w.-.
+        .-.-.-.w.w.w
+        w.-.w.-.w.w.
+    '''),
+    # Продолжение взятия простой шашкой с последней горизонтали
+    'promotion': (SideType.WHITE, '''
+        .-.b.b.-.-.-
+        -.-.b.-.b.b.
+        .-.b.b.-.-.-
+        w.-.-.b.-.b.
+        .-.-.w.-.-.b
+        -.-.b.-.-.b.
+        .-.-.-.-.-.-
+        -.-.w.w.-.-.
+        .-.-.-.-.-.-
+        w.-.-.w.w.-.
+        .-.-.-.-.-.w
+        -.-.-.-.-.-.
+    '''),
+    # Эндшпиль с дамками: дальние ходы и взятия
+    'queens': (SideType.WHITE, '''
+        .-.-.-.-.-.-
+        -.-.-.b.-.W.
+        .-.-.B.-.-.-
+        -.-.-.-.-.-.
+        .-.b.-.-.b.-
+        -.-.-.-.-.-.
+        .-.-.-.W.-.-
+        -.-.-.-.B.-.
+        .-.-.-.-.-.-
+        -.W.w.-.-.-.
+        .-.-.-.-.-.-
+        w.-.-.-.-.-.
+    '''),
+}
+
+# Эталонное число позиций на глубинах 1, 2, ...
+REFERENCE = {
+    'start': [11, 121, 1222, 10053, 79070, 586878],
+    'midgame': [16, 198, 2643, 34609, 469875],
+    'multijump': [2, 3, 37, 525, 9071, 127555],
+    'promotion': [2, 23, 244, 2816, 30010, 368186],
+    'queens': [5, 102, 3199, 60448, 1467102],
+}
+
+
+def board_from_diagram(diagram: str, x_size: int = X_SIZE, y_size: int = Y_SIZE) -> BitBoard:
+    '''Доска по диаграмме позиции'''
+    rows = diagram.split()
+    if len(rows) != y_size or any(len(row) != x_size for row in rows):
+        raise ValueError(f'Диаграмма должна состоять из {y_size} строк по {x_size} клеток')
+
+    board = BitBoard(x_size, y_size)
+    for y, row in enumerate(rows):
+        for x, cell in enumerate(row):
+            if cell == '.':
+                if board.layout.squares[y][x] >= 0:
+                    raise ValueError(f'Клетка {x}-{y} тёмная, а отмечена как светлая')
+                continue
+            if cell not in DIAGRAM_CHECKERS:
+                raise ValueError(f'Неизвестное обозначение клетки {x}-{y}: {cell!r}')
+            board.set_type_at(x, y, DIAGRAM_CHECKERS[cell])
+    return board
+
+
+def diagram_from_board(board: BitBoard) -> str:
+    '''Диаграмма позиции по доске'''
+    symbols = {checker_type: symbol for symbol, checker_type in DIAGRAM_CHECKERS.items()}
+    layout = board.layout
+    return '\n'.join(''.join(symbols[board.type_at(x, y)] if layout.squares[y][x] >= 0 else '.'
+                             for x in range(layout.x_size))
+                     for y in range(layout.y_size))
+
+
+def get_position(name: str) -> tuple[BitBoard, SideType]:
+    '''Доска и очередь хода тестовой позиции'''
+    side, diagram = POSITIONS[name]
+    if diagram is None:
+        board = BitBoard(X_SIZE, Y_SIZE)
+        board.generate()
+        return board, side
+    return board_from_diagram(diagram), side
+
+
+def perft(board: BitBoard, side: SideType, depth: int) -> int:
+    '''Число позиций после depth ходов стороны side и её противника'''
+    if depth == 0:
+        return 1
+    turns = board.turns(side)
+    if depth == 1:
+        return len(turns)
+    nodes = 0
+    opposite = SideType.opposite(side)
+    for turn in turns:
+        undo = board.make_turn(turn)
+        nodes += perft(board, opposite, depth - 1)
+        board.unmake_turn(undo)
+    return nodes
+
+
+def divide(board: BitBoard, side: SideType, depth: int) -> dict[str, int]:
+    '''Число позиций после каждого хода (для поиска расхождений)'''
+    nodes = {}
+    for turn in board.turns(side):
+        undo = board.make_turn(turn)
+        nodes[str(turn)] = perft(board, SideType.opposite(side), depth - 1)
+        board.unmake_turn(undo)
+    return nodes
+
+
+def run(depth: int, names: list[str] = None, show_divide: bool = False) -> bool:
+    '''Подсчёт позиций до глубины depth со сверкой с эталоном; True, если расхождений нет'''
+    ok = True
+    for name in names or POSITIONS:
+        board, side = get_position(name)
+        reference = REFERENCE.get(name, [])
+        print(f'{name}: ход {"белых" if side == SideType.WHITE else "чёрных"}')
+
+        for current_depth in range(1, depth + 1):
+            start = perf_counter()
+            nodes = perft(board, side, current_depth)
+            elapsed = perf_counter() - start
+            nps = int(nodes / elapsed) if elapsed > 0 else 0
+
+            if current_depth <= len(reference):
+                expected = reference[current_depth - 1]
+                status = 'верно' if nodes == expected else f'ОШИБКА, ожидалось {expected}'
+                ok = ok and nodes == expected
+            else:
+                status = 'нет эталона'
+            print(f'  глубина {current_depth:2}: {nodes:12} позиций, {elapsed:8.2f} с, {nps:9} поз/с, {status}')
+
+        if show_divide:
+            for move, nodes in divide(board, side, depth).items():
+                print(f'    {move}: {nodes}')
+    return ok
@@ -0,0 +1,233 @@
+'''Текстовый протокол движка через stdin/stdout
+
+Запуск: python -m canadian_checkers engine
+
+Команды и ответы - строки из слов через пробел. Ход целиком записывается
+клетками через двоеточие, клетка - как x-y: 2-7:1-6 или 5-4:7-2:9-0. Если
+начальной и конечной клетки достаточно, чтобы отличить ход, промежуточные
+клетки можно не указывать.
+
+    isready                          readyok
+    newgame                          начальная позиция, таблица транспозиций очищается
+    position start [moves <ход>...]  начальная позиция и ходы от неё
+    position diagram <w|b> <строка>/<строка>/... [moves <ход>...]
+                                     позиция по диаграмме (как в perft) и очередь хода
+    position fen <позиция> [moves <ход>...]
+                                     позиция в стиле FEN (см. модуль notation)
+    show                             диаграмма позиции, очередь хода и fen <позиция>
+    moves                            moves <ход>...
+    apply <ход>...                   ok
+    go [depth <N>] [movetime <с>]    info depth ... score ... nodes ... nps ... time ... pv ...
+                                     bestmove <ход> | bestmove none
+    perft <N>                        perft <N> <число позиций>
+    quit
+
+Ошибка в команде - ответ error <описание>; позиция при этом не меняется.
+Интерфейс tkinter не загружается, поэтому движок можно запускать множеством
+лёгких процессов.
+'''
+import sys
+
+from .core import SideType, Move, BitBoard, Turn, X_SIZE, Y_SIZE
+from .engine import TT_SIZE_MB, MAX_PLY, Engine
+from .notation import position_to_fen, position_from_fen
+from .perft import board_from_diagram, diagram_from_board, perft
+
+# Обозначения очереди хода
+SIDE_NAMES = {'w': SideType.WHITE, 'b': SideType.BLACK}
+
+
+def moves_to_text(moves: list[Move]) -> str:
+    '''Запись хода целиком по его перемещениям: клетки через двоеточие'''
+    first = moves[0]
+    return ':'.join([f'{first.from_x}-{first.from_y}'] + [f'{move.to_x}-{move.to_y}' for move in moves])
+
+
+def turn_to_text(turn: Turn) -> str:
+    '''Запись хода целиком'''
+    return moves_to_text(turn.moves)
+
+
+def turn_from_text(board: BitBoard, side: SideType, text: str) -> Turn:
+    '''Ход по записи среди возможных ходов стороны side'''
+    try:
+        cells = [tuple(map(int, cell.split('-'))) for cell in text.split(':')]
+    except ValueError:
+        raise ValueError(f'Неверная запись хода: {text}') from None
+    if len(cells) < 2 or any(len(cell) != 2 for cell in cells):
+        raise ValueError(f'Неверная запись хода: {text}')
+
+    turns = board.turns(side)
+    for turn in turns:
+        first = turn.moves[0]
+        if cells == [(first.from_x, first.from_y)] + [(move.to_x, move.to_y) for move in turn.moves]:
+            return turn
+
+    # Сокращённая запись: только начальная и конечная клетки
+    if len(cells) == 2:
+        found = {}
+        for turn in turns:
+            first, last = turn.moves[0], turn.moves[-1]
+            if cells == [(first.from_x, first.from_y), (last.to_x, last.to_y)]:
+                found.setdefault(turn.captured_mask, turn)
+        if len(found) == 1:
+            return found.popitem()[1]
+        if found:
+            raise ValueError(f'Ход {text} неоднозначен, укажите все клетки')
+    raise ValueError(f'Невозможный ход: {text}')
+
+
+# Определение протокола
+class EngineProtocol:
+    '''Разбор команд протокола и ответы на них'''
+
+    def __init__(self, output=sys.stdout, engine: Engine = None):
+        self.output = output
+        self.engine = engine if engine is not None else Engine()
+        self.engine.on_iteration = self.send_info
+        self.board = BitBoard(X_SIZE, Y_SIZE)
+        self.side = SideType.WHITE
+        self.set_start()
+        self.commands = {
+            'isready': self.cmd_isready,
+            'newgame': self.cmd_newgame,
+            'position': self.cmd_position,
+            'show': self.cmd_show,
+            'moves': self.cmd_moves,
+            'apply': self.cmd_apply,
+            'go': self.cmd_go,
+            'perft': self.cmd_perft,
+        }
+
+    def send(self, line: str):
+        print(line, file=self.output, flush=True)
+
+    def send_info(self, result):
+        '''Строка info по результату итерации поиска'''
+        pv = ' '.join(turn_to_text(turn) for turn in result.pv)
+        self.send(f'info depth {result.depth} score {result.score} nodes {result.nodes} nps {result.nps} '
+                  f'time {int(result.elapsed * 1000)} pv {pv}'.rstrip())
+
+    def set_start(self):
+        self.board = BitBoard(X_SIZE, Y_SIZE)
+        self.board.generate()
+        self.side = SideType.WHITE
+
+    def handle(self, line: str) -> bool:
+        '''Выполнение одной команды; False - команда quit'''
+        words = line.split()
+        if not words:
+            return True
+        if words[0] == 'quit':
+            return False
+        command = self.commands.get(words[0])
+        if command is None:
+            self.send(f'error неизвестная команда: {words[0]}')
+            return True
+        try:
+            command(words[1:])
+        except ValueError as error:
+            self.send(f'error {error}')
+        return True
+
+    def run(self, lines):
+        '''Обработка команд до quit или конца ввода'''
+        for line in lines:
+            if not self.handle(line):
+                break
+
+    def apply_turns(self, board: BitBoard, side: SideType, texts: list[str]) -> SideType:
+        '''Ходы по очереди на доске board; возвращает сторону, чья очередь после них'''
+        for text in texts:
+            board.make_turn(turn_from_text(board, side, text))
+            side = SideType.opposite(side)
+        return side
+
+    def cmd_isready(self, args: list[str]):
+        self.send('readyok')
+
+    def cmd_newgame(self, args: list[str]):
+        self.engine.tt.clear()
+        self.set_start()
+
+    def cmd_position(self, args: list[str]):
+        if not args:
+            raise ValueError('Не указана позиция')
+        if args[0] == 'start':
+            board = BitBoard(X_SIZE, Y_SIZE)
+            board.generate()
+            side = SideType.WHITE
+            rest = args[1:]
+        elif args[0] == 'diagram':
+            if len(args) < 3 or args[1] not in SIDE_NAMES:
+                raise ValueError('Формат: position diagram <w|b> <строка>/<строка>/...')
+            side = SIDE_NAMES[args[1]]
+            board = board_from_diagram(args[2].replace('/', ' '))
+            rest = args[3:]
+        elif args[0] == 'fen':
+            if len(args) < 2:
+                raise ValueError('Формат: position fen <позиция>')
+            board, side = position_from_fen(args[1])
+            rest = args[2:]
+        else:
+            raise ValueError(f'Неизвестный вид позиции: {args[0]}')
+
+        if rest:
+            if rest[0] != 'moves':
+                raise ValueError(f'Ожидалось moves, получено {rest[0]}')
+            side = self.apply_turns(board, side, rest[1:])
+        self.board, self.side = board, side
+
+    def cmd_show(self, args: list[str]):
+        for row in diagram_from_board(self.board).split('\n'):
+            self.send(row)
+        self.send(f'side {"w" if self.side == SideType.WHITE else "b"}')
+        self.send(f'fen {position_to_fen(self.board, self.side)}')
+
+    def cmd_moves(self, args: list[str]):
+        self.send(' '.join(['moves'] + [turn_to_text(turn) for turn in self.board.turns(self.side)]))
+
+    def cmd_apply(self, args: list[str]):
+        board = self.board.copy()
+        self.side = self.apply_turns(board, self.side, args)
+        self.board = board
+        self.send('ok')
+
+    def cmd_go(self, args: list[str]):
+        limits = dict(zip(args[::2], args[1::2]))
+        try:
+            if len(args) % 2 or not set(limits) <= {'depth', 'movetime'}:
+                raise ValueError
+            depth = int(limits['depth']) if 'depth' in limits else None
+            movetime = float(limits['movetime']) if 'movetime' in limits else None
+        except ValueError:
+            raise ValueError('Формат: go [depth <N>] [movetime <с>]') from None
+        # Ходы-убийцы хранятся для MAX_PLY полуходов, глубже поиск не идёт
+        if depth is not None and not 1 <= depth <= MAX_PLY:
+            raise ValueError(f'Глубина поиска должна быть от 1 до {MAX_PLY}')
+
+        # Ограничения действуют только на этот поиск; только с depth поиск не ограничен по времени
+        engine = self.engine
+        saved = engine.depth, engine.time_limit, engine.soft_time_limit
+        if depth is not None:
+            engine.depth = depth
+            engine.time_limit = engine.soft_time_limit = float('inf')
+        if movetime is not None:
+            engine.time_limit = engine.soft_time_limit = movetime
+        try:
+            result = engine.search(self.board, self.side)
+        finally:
+            engine.depth, engine.time_limit, engine.soft_time_limit = saved
+
+        self.send(f'bestmove {moves_to_text(result.moves) if result.moves else "none"}')
+
+    def cmd_perft(self, args: list[str]):
+        if len(args) != 1 or not args[0].isdigit():
+            raise ValueError('Формат: perft <N>')
+        depth = int(args[0])
+        self.send(f'perft {depth} {perft(self.board.copy(), self.side, depth)}')
+
+
+def run(input=sys.stdin, output=sys.stdout, tt_size_mb: float = TT_SIZE_MB):
+    '''Работа движка по протоколу: команды из input, ответы в output'''
+    EngineProtocol(output, Engine(tt_size_mb=tt_size_mb)).run(input)
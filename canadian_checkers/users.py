@@ -0,0 +1,318 @@
+'''Хранилище пользователей и хеширование паролей
+
+По умолчанию пользователи хранятся в базе SQLite в режиме WAL. Имя
+пользователя - первичный ключ, поэтому вход - поиск по индексу, а регистрация -
+одна атомарная вставка: одновременные регистрации с нескольких компьютеров не
+теряются и не затирают друг друга. Прежний файл users.json переносится в базу
+при первом открытии.
+
+Пароли хешируются медленной функцией (PBKDF2 или scrypt) со случайной солью,
+поэтому проверка пароля занимает доли секунды; интерфейс вызывает check_user и
+register_user в фоновом потоке.
+'''
+import abc
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Определение констант хранилища
+USERS_DB_PATH = 'users.db'
+USERS_JSON_PATH = 'users.json'
+USER_CACHE_SIZE = 1024
+SQLITE_TIMEOUT = 10.0
+
+# Параметры хеширования паролей (подбираются под оборудование так, чтобы вход занимал доли секунды)
+PASSWORD_KDF = 'pbkdf2_sha256'
+PBKDF2_ITERATIONS = 600000
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_SIZE = 16
+
+
+# Определение хранилища пользователей
+class UserStore(abc.ABC):
+    '''Хранилище пользователей: имя -> хеш пароля. Основа для хранилищ на разных носителях'''
+
+    @abc.abstractmethod
+    def get(self, username: str) -> str:
+        '''Хеш пароля пользователя или None, если пользователя нет'''
+
+    @abc.abstractmethod
+    def add(self, username: str, password_hash: str) -> bool:
+        '''Добавление пользователя; False, если имя уже занято'''
+
+    def add_many(self, users) -> int:
+        '''Добавление пар (имя, хеш); занятые имена пропускаются. Возвращает число добавленных'''
+        return sum(self.add(username, password_hash) for username, password_hash in users)
+
+    @abc.abstractmethod
+    def update(self, username: str, password_hash: str) -> bool:
+        '''Замена хеша пароля; False, если пользователя нет'''
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        '''Количество пользователей'''
+
+    def close(self):
+        '''Закрытие хранилища'''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteUserStore(UserStore):
+    '''Пользователи в базе SQLite с кэшем последних найденных записей.
+
+    В кэш попадают только найденные пользователи: пользователь, которого нет,
+    мог быть зарегистрирован с другого компьютера.
+    '''
+
+    def __init__(self, path: str = USERS_DB_PATH, cache_size: int = USER_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        # Одно соединение на хранилище; обращения из разных потоков идут по очереди
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=SQLITE_TIMEOUT, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS users ('
+                                'username TEXT PRIMARY KEY, password_hash TEXT NOT NULL) WITHOUT ROWID')
+
+    def get(self, username: str) -> str:
+        with self.lock:
+            password_hash = self.cache.get(username)
+            if password_hash is not None:
+                self.cache.move_to_end(username)
+                return password_hash
+
+            row = self.connection.execute('SELECT password_hash FROM users WHERE username = ?',
+                                          (username,)).fetchone()
+            if row is None:
+                return None
+            self._remember(username, row[0])
+            return row[0]
+
+    def add(self, username: str, password_hash: str) -> bool:
+        with self.lock:
+            cursor = self.connection.execute('INSERT OR IGNORE INTO users VALUES (?, ?)', (username, password_hash))
+            if cursor.rowcount != 1:
+                return False
+            self._remember(username, password_hash)
+            return True
+
+    def add_many(self, users) -> int:
+        with self.lock:
+            # Одна транзакция на всю пачку
+            with self.connection:
+                self.connection.execute('BEGIN IMMEDIATE')
+                cursor = self.connection.executemany('INSERT OR IGNORE INTO users VALUES (?, ?)', users)
+            return cursor.rowcount
+
+    def update(self, username: str, password_hash: str) -> bool:
+        with self.lock:
+            cursor = self.connection.execute('UPDATE users SET password_hash = ? WHERE username = ?',
+                                             (password_hash, username))
+            if cursor.rowcount != 1:
+                self.cache.pop(username, None)
+                return False
+            self._remember(username, password_hash)
+            return True
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+            self.cache.clear()
+
+    def _remember(self, username: str, password_hash: str):
+        # Вызывается под блокировкой
+        self.cache[username] = password_hash
+        self.cache.move_to_end(username)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+class JSONUserStore(UserStore):
+    '''Пользователи в файле JSON (прежний формат): каждое обращение читает весь файл,
+    а регистрация переписывает его целиком'''
+
+    def __init__(self, path: str = USERS_JSON_PATH):
+        self.path = path
+
+    def load(self) -> dict:
+        '''Все пользователи из файла'''
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, username: str) -> str:
+        return self.load().get(username)
+
+    def add(self, username: str, password_hash: str) -> bool:
+        users = self.load()
+        if username in users:
+            return False
+        users[username] = password_hash
+        self.save(users)
+        return True
+
+    def update(self, username: str, password_hash: str) -> bool:
+        users = self.load()
+        if username not in users:
+            return False
+        users[username] = password_hash
+        self.save(users)
+        return True
+
+    def save(self, users: dict):
+        '''Запись всех пользователей в файл'''
+        with open(self.path, 'w') as file:
+            json.dump(users, file)
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+
+def migrate_json(store: UserStore, path: str = USERS_JSON_PATH) -> int:
+    '''Перенос пользователей из файла JSON в хранилище; файл переименовывается в *.bak.
+    Возвращает число перенесённых пользователей'''
+    source = Path(path)
+    if not source.exists():
+        return 0
+    migrated = store.add_many(JSONUserStore(path).load().items())
+    try:
+        source.replace(source.with_name(source.name + '.bak'))
+    except FileNotFoundError:
+        # Файл уже перенесён с другого компьютера
+        pass
+    return migrated
+
+
+# Хранилище по умолчанию открывается при первом обращении
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_user_store() -> UserStore:
+    '''Хранилище пользователей по умолчанию (SQLite) с перенесёнными пользователями из users.json'''
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SQLiteUserStore(USERS_DB_PATH)
+            migrate_json(_default_store, USERS_JSON_PATH)
+        return _default_store
+
+
+def set_user_store(store: UserStore):
+    '''Замена хранилища по умолчанию'''
+    global _default_store
+    with _default_store_lock:
+        _default_store = store
+
+
+# Определение хеширования паролей
+class PasswordHasher:
+    '''Хеширование паролей функцией PBKDF2-SHA256 или scrypt.
+
+    Хеш хранится вместе с параметрами: pbkdf2_sha256$итерации$соль$ключ или
+    scrypt$n$r$p$соль$ключ (соль и ключ в шестнадцатеричном виде). Поэтому
+    параметры можно менять: старые хеши проверяются со своими параметрами и
+    пересчитываются при следующем входе. Строка из 64 шестнадцатеричных цифр -
+    прежний хеш SHA-256 без соли.
+    '''
+
+    KDFS = ('pbkdf2_sha256', 'scrypt')
+
+    def __init__(self, kdf: str = PASSWORD_KDF, iterations: int = PBKDF2_ITERATIONS,
+                 n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P):
+        if kdf not in self.KDFS:
+            raise ValueError(f'Неизвестная функция хеширования: {kdf}')
+        self.kdf = kdf
+        self.params = (iterations,) if kdf == 'pbkdf2_sha256' else (n, r, p)
+
+    def hash(self, password: str) -> str:
+        '''Хеш пароля с новой случайной солью'''
+        salt = os.urandom(SALT_SIZE)
+        key = self._derive(self.kdf, self.params, password, salt)
+        return '$'.join([self.kdf, *map(str, self.params), salt.hex(), key.hex()])
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        '''Проверка пароля по хешу любого поддерживаемого вида'''
+        if self.is_legacy(password_hash):
+            return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), password_hash)
+        try:
+            kdf, *params, salt, key = password_hash.split('$')
+            derived = self._derive(kdf, tuple(map(int, params)), password, bytes.fromhex(salt))
+        except ValueError:
+            return False
+        return hmac.compare_digest(derived.hex(), key)
+
+    def needs_update(self, password_hash: str) -> bool:
+        '''Хеш прежнего вида или с другими параметрами нужно пересчитать'''
+        return not password_hash.startswith('$'.join([self.kdf, *map(str, self.params)]) + '$')
+
+    @staticmethod
+    def is_legacy(password_hash: str) -> bool:
+        '''Прежний хеш SHA-256 без соли'''
+        return len(password_hash) == 64 and '$' not in password_hash
+
+    @staticmethod
+    def _derive(kdf: str, params: tuple, password: str, salt: bytes) -> bytes:
+        if kdf == 'pbkdf2_sha256' and len(params) == 1:
+            return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, params[0])
+        if kdf == 'scrypt' and len(params) == 3:
+            n, r, p = params
+            return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p + (1 << 20))
+        raise ValueError(f'Неизвестные параметры хеширования: {kdf} {params}')
+
+
+_password_hasher = PasswordHasher()
+
+
+def set_password_hasher(hasher: PasswordHasher):
+    '''Замена параметров хеширования паролей'''
+    global _password_hasher
+    _password_hasher = hasher
+
+
+def hash_password(password: str) -> str:
+    '''Хеш пароля'''
+    return _password_hasher.hash(password)
+
+
+def check_user(username: str, password: str, store: UserStore = None) -> bool:
+    """Проверка существования пользователя. Хеш прежнего вида пересчитывается при верном пароле"""
+    store = store if store is not None else get_user_store()
+    hasher = _password_hasher
+    password_hash = store.get(username)
+    if password_hash is None:
+        # Время ответа не должно выдавать, есть ли такой пользователь
+        hasher.hash(password)
+        return False
+    if not hasher.verify(password, password_hash):
+        return False
+    if hasher.needs_update(password_hash):
+        store.update(username, hasher.hash(password))
+    return True
+
+
+def register_user(username: str, password: str, store: UserStore = None) -> bool:
+    """Регистрация нового пользователя"""
+    store = store if store is not None else get_user_store()
+    return store.add(username, hash_password(password))
@@ -0,0 +1,175 @@
+'''Поиск компьютера в фоновом потоке
+
+Движок считает в отдельном потоке, а готовые результаты передаются через
+потокобезопасную очередь, которую интерфейс опрашивает через after(), поэтому
+цикл событий Tk не останавливается, пока компьютер думает. Пока ходит человек,
+движок обдумывает ответ на ожидаемый ход; если человек сделал именно его,
+начатый поиск продолжается уже с ограничением по времени, а готовый результат
+отдаётся сразу.
+'''
+import queue
+import threading
+from time import perf_counter
+
+from .core import SideType, BitBoard
+from .engine import Engine, SearchResult, find_turn
+
+
+# Определение задания на поиск
+class SearchTask:
+    '''Позиция и сторона, за которую ищется ход.
+
+    Задание на обдумывание сначала содержит позицию перед ходом человека; в
+    потоке поиска на ней делается ожидаемый ход, и key становится ключом
+    позиции, при которой обдумывание засчитывается.
+    '''
+
+    def __init__(self, board: BitBoard, side: SideType, ponder: bool = False):
+        self.board = board
+        self.side = side
+        self.ponder = ponder
+        self.key = None
+        self.deadline = float('inf') if ponder else None
+        self.soft_deadline = self.deadline
+        self.result = None
+        self.cancelled = False
+
+
+# Определение фонового компьютерного противника
+class EngineWorker:
+    '''Компьютерный противник в фоновом потоке.
+
+    С движком и его таблицей транспозиций работает только поток поиска; главный
+    поток ставит задания и забирает результаты через poll(). Считается только
+    последнее поставленное задание: новое задание отменяет предыдущее.
+    '''
+
+    def __init__(self, engine: Engine = None, pondering: bool = True):
+        self.engine = engine if engine is not None else Engine()
+        self.pondering = pondering
+        self.requests = queue.SimpleQueue()
+        self.results = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.task = None  # Последнее поставленное задание
+        self.running = None  # Задание, которое сейчас считается
+        self.ponder_hits = 0
+        self.thread = threading.Thread(target=self._run, name='engine', daemon=True)
+        self.thread.start()
+
+    def search(self, board: BitBoard, side: SideType):
+        '''Начало поиска хода за сторону side; результат забирается через poll()'''
+        key = board.side_hash(side)
+        with self.lock:
+            task = self.task
+            if task is not None and task.ponder and task.key == key:
+                # Сделан ожидаемый ход: обдумывание становится поиском с ограничением по времени
+                task.ponder = False
+                self._start_clock(task)
+                self.ponder_hits += 1
+                if task.result is not None:
+                    self.results.put((task, task.result))
+                self._sync_deadline()
+                return
+            self._cancel()
+            self.task = SearchTask(board.copy(), side)
+            self.requests.put(self.task)
+
+    def ponder(self, board: BitBoard, side: SideType):
+        '''Обдумывание на время хода стороны side (человека)'''
+        with self.lock:
+            self._cancel()
+            if self.pondering:
+                self.task = SearchTask(board.copy(), side, ponder=True)
+                self.requests.put(self.task)
+
+    def poll(self) -> SearchResult:
+        '''Результат последнего поиска, если он готов; не блокирует'''
+        with self.lock:
+            self._sync_deadline()
+            while True:
+                try:
+                    task, result = self.results.get_nowait()
+                except queue.Empty:
+                    return None
+                if task is self.task and not task.cancelled:
+                    self.task = None
+                    return result
+
+    def cancel(self):
+        '''Отмена поиска и обдумывания'''
+        with self.lock:
+            self._cancel()
+
+    def close(self):
+        '''Остановка потока поиска'''
+        self.cancel()
+        self.requests.put(None)
+        self.thread.join()
+
+    def _cancel(self):
+        # Вызывается под блокировкой
+        if self.task is not None:
+            self.task.cancelled = True
+            self.task = None
+        self._sync_deadline()
+
+    def _start_clock(self, task: SearchTask):
+        '''Отсчёт времени на ход с текущего момента'''
+        now = perf_counter()
+        task.deadline = now + self.engine.time_limit
+        task.soft_deadline = now + min(self.engine.soft_time_limit, self.engine.time_limit)
+
+    def _sync_deadline(self):
+        '''Перенос сроков текущего задания в движок (вызывается под блокировкой).
+
+        Повторяется при каждом опросе: сроки могли измениться, пока поиск только
+        запускался и ещё не записал в движок свои.
+        '''
+        task = self.running
+        if task is None:
+            return
+        if task.cancelled:
+            self.engine.deadline = self.engine.soft_deadline = 0.0
+        else:
+            self.engine.deadline = task.deadline
+            self.engine.soft_deadline = task.soft_deadline
+
+    def _predict(self, task: SearchTask) -> bool:
+        '''Ожидаемый ход человека: лучший ход из таблицы транспозиций или первый из возможных'''
+        board, side = task.board, task.side
+        turns = board.turns(side, unique=True)
+        if not turns:
+            return False
+        entry = self.engine.tt.probe(board.side_hash(side))
+        turn = (find_turn(turns, entry[4]) if entry is not None else None) or turns[0]
+
+        board.make_turn(turn)
+        task.side = SideType.opposite(side)
+        task.key = board.side_hash(task.side)
+        return True
+
+    def _run(self):
+        '''Цикл потока поиска'''
+        while True:
+            task = self.requests.get()
+            if task is None:
+                return
+            with self.lock:
+                if task.cancelled or (task.key is None and task.ponder and not self._predict(task)):
+                    continue
+                if task.deadline is None:
+                    self._start_clock(task)
+                self.running = task
+                deadline, soft_deadline = task.deadline, task.soft_deadline
+
+            result = self.engine.search(task.board, task.side, deadline, soft_deadline)
+
+            with self.lock:
+                self.running = None
+                if task.cancelled:
+                    continue
+                if task.ponder:
+                    # Результат обдумывания ждёт, пока человек не сделает ожидаемый ход
+                    task.result = result
+                else:
+                    self.results.put((task, result))
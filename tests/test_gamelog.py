@@ -0,0 +1,98 @@
+'''Проверка журнала партий: запись и чтение, оборванные и испорченные записи'''
+import os
+import random
+import tempfile
+import unittest
+import zlib
+
+from canadian_checkers.core import GameState, X_SIZE, Y_SIZE
+from canadian_checkers.gamelog import (
+    GameLog, RECORD_HEADER, RECORD_MARKER, MAX_RECORD_SIZE, LOG_MAGIC, record_from_game, encode_record, read_games
+)
+
+
+def random_records(count: int, seed: int = 0) -> list:
+    '''Записи случайных партий разной длины'''
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(count):
+        game = GameState(X_SIZE, Y_SIZE)
+        for _ in range(rnd.randrange(1, 80)):
+            if game.continuing_cell:
+                moves = game.get_required_moves_list_for_checker(game.current_player, game.continuing_cell.x,
+                                                                 game.continuing_cell.y)
+            else:
+                moves = game.get_moves_list(game.current_player)
+            if not moves:
+                break
+            game.play_move(rnd.choice(moves))
+        records.append(record_from_game(game, game.get_winner()))
+    return records
+
+
+def frame(record) -> bytes:
+    '''Запись партии в том виде, в каком она лежит в файле'''
+    payload = encode_record(record)
+    return RECORD_HEADER.pack(RECORD_MARKER, len(payload), zlib.crc32(payload)) + payload
+
+
+class GameLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'games.log')
+        self.records = random_records(20)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, records):
+        with GameLog(self.path, sync_every=8) as log:
+            for record in records:
+                log.append(record)
+
+    def read(self, chunk_size: int = 64) -> list:
+        return list(read_games(self.path, chunk_size=chunk_size))
+
+    def test_round_trip(self):
+        self.write(self.records)
+        for chunk_size in (7, 64, 1 << 20):
+            self.assertEqual(self.read(chunk_size), self.records)
+
+    def test_torn_tail(self):
+        self.write(self.records)
+        with open(self.path, 'ab') as file:
+            file.write(frame(self.records[0])[:-5])
+        self.assertEqual(self.read(), self.records)
+
+    def test_torn_record_before_valid_ones(self):
+        # Оборванная запись длиннее остатка файла, а за ней дописаны целые записи
+        head, tail = self.records[:10], self.records[10:12]
+        self.write(head)
+        with open(self.path, 'ab') as file:
+            file.write(RECORD_HEADER.pack(RECORD_MARKER, MAX_RECORD_SIZE, 0) + b'\0' * 10)
+        self.write(tail)
+        self.assertEqual(self.read(), head + tail)
+
+    def test_corrupt_records(self):
+        self.write(self.records)
+        frames = [frame(record) for record in self.records]
+        offsets = [len(LOG_MAGIC) + sum(map(len, frames[:i])) for i in range(len(frames))]
+        data = bytearray(open(self.path, 'rb').read())
+        # Испорчены содержимое третьей записи и метка седьмой
+        data[offsets[2] + RECORD_HEADER.size + 3] ^= 0xff
+        data[offsets[6]] = 0
+        with open(self.path, 'wb') as file:
+            file.write(data)
+        expected = [record for i, record in enumerate(self.records) if i not in (2, 6)]
+        self.assertEqual(self.read(), expected)
+
+    def test_not_a_log(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a game log')
+        with self.assertRaises(ValueError):
+            self.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
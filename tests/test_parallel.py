@@ -0,0 +1,47 @@
+'''Проверка параллельного поиска: тот же ход и та же оценка, что у Engine'''
+import unittest
+
+from canadian_checkers.engine import Engine
+from canadian_checkers.parallel import ParallelEngine
+from canadian_checkers.perft import get_position
+
+DEPTH = 3
+UNLIMITED = float('inf')
+
+
+class ParallelEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = ParallelEngine(DEPTH, time_limit=UNLIMITED, workers=2, soft_time_limit=UNLIMITED)
+        cls.engine.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.close()
+
+    def assert_same_result(self, name: str):
+        board, side = get_position(name)
+        expected = Engine(DEPTH, time_limit=UNLIMITED, soft_time_limit=UNLIMITED).search(board, side)
+        self.engine.tt.clear()
+        result = self.engine.search(board, side)
+        self.assertEqual((result.moves, result.score, result.depth),
+                         (expected.moves, expected.score, expected.depth))
+
+    def test_best_turn_not_first(self):
+        # Лучший ход не первый в порядке генератора: исполнитель должен считать тот ход,
+        # который ему передан, а не ход с тем же номером в своём списке
+        board, side = get_position('queens')
+        first = board.turns(side, unique=True)[0]
+        expected = Engine(DEPTH, time_limit=UNLIMITED, soft_time_limit=UNLIMITED).search(board, side)
+        self.assertNotEqual(expected.moves[:len(first.moves)], list(first.moves))
+        self.assert_same_result('queens')
+
+    def test_positions(self):
+        for name in ('start', 'midgame', 'multijump', 'promotion'):
+            with self.subTest(name):
+                self.assert_same_result(name)
+
+
+if __name__ == '__main__':
+    unittest.main()